@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -52,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,8 +62,57 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.profiling.ProfilingMiddleware',
 ]
 
+# DB, view and render time of each request, logged to the core.timing
+# logger and/or sent in a Server-Timing header. The header shows query
+# counts and timings to every client, only turn it on for development
+SERVER_TIMING_HEADER = bool(int(os.environ.get('SERVER_TIMING_HEADER', 0)))
+SERVER_TIMING_LOG = bool(int(os.environ.get('SERVER_TIMING_LOG', 0)))
+
+# cProfile of requests made by staff with an X-Profile header or ?profile=1,
+# plus a sampled fraction (0 to 1) of all requests. Kept outside /vol/web
+# since the proxy serves that volume publicly
+PROFILE_ROOT = os.environ.get('PROFILE_ROOT', '/vol/profiles')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+
+# Bearer token Prometheus scrapes /api/metrics/ with, the endpoint refuses
+# every request while it is unset
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.health': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'recipe.images': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -96,6 +148,56 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# locmem is per process and only valid with a single process serving the
+# API. Under uWSGI's workers an invalidation would only reach the worker
+# that made it, so caches that must stay coherent are off with locmem
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+# Seen by every worker process
+CACHE_SHARED = CACHE_BACKEND != 'locmem'
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Resized copies of uploaded recipe images, made by a thread pool in each
+# worker after the upload commits
+IMAGE_VARIANT_WIDTHS = [
+    int(width) for width in os.environ.get(
+        'IMAGE_VARIANT_WIDTHS', '320,640,1280',
+    ).split(',')
+]
+IMAGE_VARIANT_FORMATS = os.environ.get(
+    'IMAGE_VARIANT_FORMATS', 'jpeg,webp',
+).split(',')
+IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+IMAGE_VARIANTS_ASYNC = bool(int(os.environ.get('IMAGE_VARIANTS_ASYNC', 1)))
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+
+# Seconds each worker reuses its readiness probe results
+HEALTH_PROBE_CACHE_SECONDS = float(
+    os.environ.get('HEALTH_PROBE_CACHE_SECONDS', 5)
+)
+
+# Seconds a rendered recipe/tag/ingredient list stays cached, 0 disables.
+# Off by default with locmem, other workers would serve stale lists
+API_LIST_CACHE_TIMEOUT = int(os.environ.get(
+    'API_LIST_CACHE_TIMEOUT',
+    300 if CACHE_SHARED else 0,
+))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -115,6 +217,29 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing cost, PBKDF2 iterations per profile. Passwords are
+# rehashed on the next login after the profile changes. Time the options
+# with `manage.py benchmark_auth`
+PASSWORD_HASH_PROFILES = {
+    'reduced': 150000,
+    'default': 320000,
+    'strong': 600000,
+}
+PASSWORD_HASH_PROFILE = os.environ.get('PASSWORD_HASH_PROFILE', 'default')
+PASSWORD_HASH_ITERATIONS = int(os.environ.get(
+    'PASSWORD_HASH_ITERATIONS',
+    PASSWORD_HASH_PROFILES[PASSWORD_HASH_PROFILE],
+))
+
+PASSWORD_HASHERS = [
+    'core.hashers.ProfiledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
 
@@ -143,10 +268,48 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "core.User"
 
+# Renderer profiles, production leaves out the browsable HTML API
+API_RENDERER_PROFILES = {
+    "default": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "production": [
+        "core.renderers.FastJSONRenderer",
+    ],
+}
+API_RENDERER_PROFILE = os.environ.get("API_RENDERER_PROFILE", "default")
+
+# JSON is rendered and parsed with orjson when installed, set API_FAST_JSON=0
+# to use the stdlib json module instead
+API_FAST_JSON = bool(int(os.environ.get("API_FAST_JSON", 1)))
+
+# Seconds a token's user id is cached in the shared cache and, for at most
+# AUTH_TOKEN_LOCAL_TIMEOUT, the user in each worker. A revoked token can be
+# accepted by other workers until their copy expires. Without a shared
+# cache only the worker copy is kept. Set 0 to query on every request
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get("AUTH_TOKEN_CACHE_TIMEOUT", 60))
+AUTH_TOKEN_LOCAL_TIMEOUT = int(os.environ.get("AUTH_TOKEN_LOCAL_TIMEOUT", 5))
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+        "core.authentication.CachedTokenAuthentication",
+    ],
+    "PAGE_SIZE": int(os.environ.get("API_PAGE_SIZE", 100)),
+    "DEFAULT_RENDERER_CLASSES": API_RENDERER_PROFILES[API_RENDERER_PROFILE],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# Pagination is set per viewset, PAGE_SIZE is only the shared default size
+SILENCED_SYSTEM_CHECKS = ["rest_framework.W001"]
+
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True
 }
\ No newline at end of file
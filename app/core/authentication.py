@@ -0,0 +1,92 @@
+"""
+Token authentication caching the token to user lookup
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_KEY = "auth:token:{digest}"
+
+# Per process, in front of the shared cache. Other workers only see an
+# invalidation once their copy expires, so its timeout bounds how long a
+# revoked token is still accepted
+local_cache = LocMemCache("auth-token", {"OPTIONS": {"MAX_ENTRIES": 10000}})
+
+
+def token_cache_key(key):
+    """Return the cache key for a token, without the token itself"""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return TOKEN_KEY.format(digest=digest)
+
+
+def password_fingerprint(user):
+    """Return a digest of the user's password hash, not the hash itself"""
+    return hashlib.sha256(user.password.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    """Drop the cached user of a token, here and in the shared cache"""
+    cache_key = token_cache_key(key)
+
+    def drop():
+        cache.delete(cache_key)
+        local_cache.delete(cache_key)
+
+    drop()
+    # A request reading before the commit may cache the old user again
+    transaction.on_commit(drop)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication reading the user from cache when possible
+
+    Only valid tokens of active users are cached. Entries are dropped
+    when the token is deleted or its user is saved, see core.signals.
+    Workers cache the user, the shared cache only its id, is_active and
+    password fingerprint.
+    """
+
+    def authenticate_credentials(self, key):
+        """Return (user, token), querying the database on a cache miss
+
+        The shared tier is skipped when the default cache is per process,
+        e.g. locmem, as invalidations would not reach the other workers.
+        """
+        timeout = settings.AUTH_TOKEN_CACHE_TIMEOUT
+        local_timeout = min(settings.AUTH_TOKEN_LOCAL_TIMEOUT, timeout)
+        if not local_timeout:
+            return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        user = local_cache.get(cache_key)
+        if user is None:
+            shared = settings.CACHE_SHARED
+            user = self._shared_user(cache_key) if shared else None
+            if user is None:
+                user, _ = super().authenticate_credentials(key)
+                if shared:
+                    cache.set(cache_key, (
+                        user.pk, user.is_active, password_fingerprint(user),
+                    ), timeout)
+            local_cache.set(cache_key, user, local_timeout)
+        # The token key is not cached, the caller already has it
+        return user, self.get_model()(key=key, user=user)
+
+    def _shared_user(self, cache_key):
+        """Return the user of a shared entry, None if missing or stale"""
+        entry = cache.get(cache_key)
+        if entry is None:
+            return None
+        user_id, is_active, fingerprint = entry
+        if not is_active:
+            return None
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            return None
+        if password_fingerprint(user) != fingerprint:
+            return None
+        return user
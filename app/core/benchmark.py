@@ -0,0 +1,26 @@
+"""
+Timing helpers shared by the benchmark commands
+"""
+import time
+
+
+def time_calls(func, count, warmup=False):
+    """Return the run times of func in seconds and its last result
+
+    With warmup func runs once more first, untimed.
+    """
+    if warmup:
+        func()
+    timings = []
+    result = None
+    for _ in range(max(count, 1)):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def best_of(func, repeat):
+    """Return the fastest run time of func and its last result"""
+    timings, result = time_calls(func, repeat)
+    return min(timings), result
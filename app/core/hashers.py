@@ -0,0 +1,18 @@
+"""
+Password hasher with its cost taken from settings
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ProfiledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with PASSWORD_HASH_ITERATIONS iterations
+
+    Keeps the pbkdf2_sha256 algorithm name, so existing hashes verify with
+    the iterations stored in them. Django rehashes a password on the next
+    successful login when its iterations differ from the current profile.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,88 @@
+"""
+Dependency probes for the readiness endpoint
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger("core.health")
+
+_lock = threading.Lock()
+_last = {"at": None, "result": None}
+
+
+def check_database():
+    """Run a trivial query on every configured database"""
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+
+def check_media():
+    """Create and remove a file in MEDIA_ROOT"""
+    with tempfile.NamedTemporaryFile(
+        dir=settings.MEDIA_ROOT,
+        prefix=".ready-",
+    ):
+        pass
+
+
+def check_cache():
+    """Write a value to the default cache and read it back"""
+    key = f"health:ready:{os.getpid()}"
+    value = uuid.uuid4().hex
+    cache.set(key, value, 30)
+    if cache.get(key) != value:
+        raise RuntimeError("value written to the cache was not read back")
+
+
+PROBES = {
+    "database": check_database,
+    "media": check_media,
+    "cache": check_cache,
+}
+
+
+def run_probes():
+    """Run every probe, return (ready, {name: {"ok", "ms"[, "error"]}})"""
+    checks = {}
+    for name, probe in PROBES.items():
+        start = time.perf_counter()
+        try:
+            probe()
+        except Exception as exc:
+            logger.warning("Readiness probe %s failed: %r", name, exc)
+            checks[name] = {"ok": False, "error": type(exc).__name__}
+        else:
+            checks[name] = {"ok": True}
+        checks[name]["ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return all(check["ok"] for check in checks.values()), checks
+
+
+def readiness():
+    """Return the probe results, reused for HEALTH_PROBE_CACHE_SECONDS
+
+    Cached per process and not in the cache being probed, so a storm of
+    probes costs one round of checks per worker every few seconds.
+    """
+    timeout = settings.HEALTH_PROBE_CACHE_SECONDS
+    with _lock:
+        now = time.monotonic()
+        if _last["at"] is None or now - _last["at"] >= timeout:
+            _last["result"] = run_probes()
+            _last["at"] = now
+        return _last["result"]
+
+
+def reset():
+    """Forget the cached probe results"""
+    with _lock:
+        _last["at"] = None
@@ -0,0 +1,118 @@
+"""
+Django command measuring login and signup throughput per hashing cost
+"""
+import os
+import statistics
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.benchmark import time_calls
+
+BENCHMARK_EMAIL = "benchmark-auth@example.com"
+BENCHMARK_PASSWORD = "benchmark-pass-123"
+
+
+class Command(BaseCommand):
+    """Time hashing, CreateTokenView and CreateUserView per profile."""
+
+    help = (
+        "Measure password hashing, login (CreateTokenView) and signup "
+        "(CreateUserView) throughput of one core for each hashing profile. "
+        "Users are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            default=list(settings.PASSWORD_HASH_PROFILES),
+            help="Profiles from PASSWORD_HASH_PROFILES to measure.",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            nargs="+",
+            default=[],
+            help="Extra PBKDF2 iteration counts to measure.",
+        )
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Worker processes to estimate total throughput for.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        unknown = set(options["profiles"]) - set(
+            settings.PASSWORD_HASH_PROFILES
+        )
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(unknown)}")
+        costs = [
+            (name, settings.PASSWORD_HASH_PROFILES[name])
+            for name in options["profiles"]
+        ] + [("custom", count) for count in options["iterations"]]
+        self.client = APIClient()
+        for name, iterations in sorted(costs, key=lambda cost: cost[1]):
+            with override_settings(PASSWORD_HASH_ITERATIONS=iterations), \
+                    transaction.atomic():
+                self.counter = 0
+                get_user_model().objects.create_user(
+                    BENCHMARK_EMAIL,
+                    BENCHMARK_PASSWORD,
+                )
+                results = [
+                    (label, time_calls(
+                        func, options["requests"], warmup=True,
+                    )[0])
+                    for label, func in (
+                        ("hash", lambda: make_password(BENCHMARK_PASSWORD)),
+                        ("login", self._login),
+                        ("signup", self._signup),
+                    )
+                ]
+                transaction.set_rollback(True)
+            self.stdout.write(f"{name} ({iterations} iterations)")
+            for label, timings in results:
+                self.stdout.write(
+                    self._format(label, timings, options["workers"])
+                )
+
+    def _login(self):
+        """Request a token for the benchmark user"""
+        res = self.client.post(reverse("user:token"), {
+            "email": BENCHMARK_EMAIL,
+            "password": BENCHMARK_PASSWORD,
+        })
+        if res.status_code != 200:
+            raise CommandError(f"Login failed with {res.status_code}")
+
+    def _signup(self):
+        """Create a user that does not exist yet"""
+        self.counter += 1
+        res = self.client.post(reverse("user:create"), {
+            "email": f"benchmark-auth-{self.counter}@example.com",
+            "password": BENCHMARK_PASSWORD,
+            "name": "Benchmark",
+        })
+        if res.status_code != 201:
+            raise CommandError(f"Signup failed with {res.status_code}")
+
+    def _format(self, label, timings, workers):
+        """Return one result line with per core and total throughput"""
+        median = statistics.median(timings)
+        rate = 1 / median if median else 0
+        return (
+            f"  {label:<7} {median * 1000:8.2f} ms"
+            f"  {rate:8.1f}/s per core"
+            f"  {rate * workers:9.1f}/s on {workers} workers"
+        )
@@ -0,0 +1,306 @@
+"""
+Django command benchmarking every API endpoint against a JSON baseline
+"""
+import json
+import math
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.management.commands.benchmark_recipe_list import add_recipes
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+BENCHMARK_EMAIL = "benchmark-endpoints@example.com"
+BENCHMARK_PASSWORD = "benchmark-pass"
+DEFAULT_BASELINE = os.path.join("benchmarks", "endpoints.json")
+# Metrics compared with the baseline, all lower is better
+METRICS = ("p50_ms", "p95_ms", "queries", "bytes", "peak_kb")
+# Deterministic metrics, any increase is a regression
+EXACT_METRICS = ("queries",)
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of values"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def jpeg_bytes():
+    """Return a small JPEG image"""
+    buffer = BytesIO()
+    Image.new("RGB", (320, 240), (200, 120, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    """Drive each route in-process and compare with a saved baseline."""
+
+    help = (
+        "Benchmark the API endpoints at several data sizes, recording "
+        "p50/p95 latency, query count, response bytes and peak allocation. "
+        "Data is created in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10, 1000],
+            help="Recipes owned by the benchmark user.",
+        )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            help="Run only these scenarios.",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=DEFAULT_BASELINE,
+            help="JSON baseline file to compare with or update.",
+        )
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Write the results to the baseline instead of comparing.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Allowed relative increase before a metric regresses, "
+                 "query counts may not increase at all.",
+        )
+        parser.add_argument(
+            "--list-cache",
+            action="store_true",
+            help="Keep the list response cache on, lists then measure hits.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        scenarios = self.scenarios()
+        names = options["only"] or list(scenarios)
+        unknown = set(names) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+        overrides = {} if options["list_cache"] else {
+            "API_LIST_CACHE_TIMEOUT": 0,
+        }
+        results = {}
+        with tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media, **overrides), \
+                transaction.atomic():
+            self._setup()
+            created = 0
+            for size in sorted(options["sizes"]):
+                add_recipes(
+                    self.user, created, size, self.tags, self.ingredients,
+                )
+                created = max(created, size)
+                self.recipe = Recipe.objects.filter(user=self.user).first()
+                for name in names:
+                    stats = self._measure(
+                        scenarios[name],
+                        options["iterations"],
+                    )
+                    results.setdefault(name, {})[str(size)] = stats
+                    self.stdout.write(self._format(name, size, stats))
+            transaction.set_rollback(True)
+
+        report = {
+            "created": timezone.now().isoformat(),
+            "iterations": options["iterations"],
+            "results": results,
+        }
+        if options["update_baseline"]:
+            directory = os.path.dirname(options["baseline"])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(options["baseline"], "w") as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(
+                f"Baseline written to {options['baseline']}"
+            ))
+            return
+        if os.path.exists(options["baseline"]):
+            self._compare(results, options["baseline"], options["threshold"])
+
+    def _setup(self):
+        """Create the benchmark user, token, tags and ingredients"""
+        self.user = get_user_model().objects.create_user(
+            BENCHMARK_EMAIL,
+            BENCHMARK_PASSWORD,
+        )
+        self.tags = Tag.objects.bulk_create(
+            Tag(user=self.user, name=f"Tag {i}") for i in range(20)
+        )
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=self.user, name=f"Ingredient {i}")
+            for i in range(50)
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user)}"
+        )
+        self.anonymous = APIClient()
+        self.image = jpeg_bytes()
+        self.counter = 0
+
+    def scenarios(self):
+        """Return scenario name -> callable making one request"""
+        recipes = reverse("recipe:recipe-list")
+        return {
+            "health": lambda: self.anonymous.get(reverse("health-check")),
+            "user-create": lambda: self.anonymous.post(
+                reverse("user:create"),
+                self._new_user(),
+            ),
+            "token": lambda: self.anonymous.post(reverse("user:token"), {
+                "email": BENCHMARK_EMAIL,
+                "password": BENCHMARK_PASSWORD,
+            }),
+            "user-me": lambda: self.client.get(reverse("user:me")),
+            "recipe-list": lambda: self.client.get(recipes),
+            "recipe-filter": lambda: self.client.get(recipes, {
+                "tags": f"{self.tags[0].id},{self.tags[5].id}",
+                "ingredients": self.ingredients[3].id,
+            }),
+            "recipe-search": lambda: self.client.get(recipes, {
+                "search": "recipe",
+            }),
+            "recipe-detail": lambda: self.client.get(
+                reverse("recipe:recipe-detail", args=[self.recipe.id]),
+            ),
+            "recipe-create": lambda: self.client.post(recipes, {
+                "title": "Benchmark recipe",
+                "time_minutes": 10,
+                "price": "5.50",
+                "tags": [{"name": "Tag 1"}, {"name": "New tag"}],
+                "ingredients": [{"name": "Ingredient 2"}],
+            }, format="json"),
+            "recipe-update": lambda: self.client.patch(
+                reverse("recipe:recipe-detail", args=[self.recipe.id]),
+                {"title": "Updated", "tags": [{"name": "Tag 3"}]},
+                format="json",
+            ),
+            "recipe-upload-image": lambda: self.client.post(
+                reverse("recipe:recipe-upload-image", args=[self.recipe.id]),
+                {"image": SimpleUploadedFile(
+                    "image.jpg", self.image, content_type="image/jpeg",
+                )},
+                format="multipart",
+            ),
+            "tag-list": lambda: self.client.get(reverse("recipe:tag-list")),
+            "tag-autocomplete": lambda: self.client.get(
+                reverse("recipe:tag-autocomplete"), {"q": "tag 1"},
+            ),
+            "ingredient-list": lambda: self.client.get(
+                reverse("recipe:ingredient-list"),
+            ),
+        }
+
+    def _new_user(self):
+        """Return a payload for a user that does not exist yet"""
+        self.counter += 1
+        return {
+            "email": f"benchmark-new-{self.counter}@example.com",
+            "password": BENCHMARK_PASSWORD,
+            "name": "Benchmark",
+        }
+
+    def _request(self, scenario):
+        """Make one request in a savepoint that is rolled back"""
+        with transaction.atomic():
+            response = scenario()
+            transaction.set_rollback(True)
+        if response.status_code >= 400:
+            raise CommandError(
+                f"{response.status_code} from {response.request['PATH_INFO']}"
+            )
+        return response
+
+    def _measure(self, scenario, iterations):
+        """Return latency, query, size and allocation stats for scenario"""
+        cache.clear()
+        self._request(scenario)
+        timings = []
+        queries = []
+        for _ in range(max(iterations, 1)):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = self._request(scenario)
+                timings.append((time.perf_counter() - start) * 1000)
+            # Leave out the savepoint statements of _request
+            queries.append(len([
+                q for q in ctx.captured_queries
+                if "SAVEPOINT" not in q["sql"]
+            ]))
+        tracemalloc.start()
+        try:
+            self._request(scenario)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "queries": statistics.median_high(queries),
+            "bytes": len(response.content),
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def _format(self, name, size, stats):
+        """Return one result line"""
+        return (
+            f"{name:<20} {size:>7}  p50 {stats['p50_ms']:8.2f} ms"
+            f"  p95 {stats['p95_ms']:8.2f} ms  {stats['queries']:>3} queries"
+            f"  {stats['bytes']:>9} B  peak {stats['peak_kb']:9.1f} KiB"
+        )
+
+    def _compare(self, results, path, threshold):
+        """Fail when a metric grew beyond threshold over the baseline"""
+        with open(path) as handle:
+            baseline = json.load(handle)["results"]
+        regressions = []
+        for name, sizes in results.items():
+            for size, stats in sizes.items():
+                old = baseline.get(name, {}).get(size)
+                if old is None:
+                    continue
+                for metric in METRICS:
+                    allowed = 0 if metric in EXACT_METRICS else threshold
+                    if stats[metric] > old[metric] * (1 + allowed):
+                        regressions.append(
+                            f"{name} [{size}] {metric}: "
+                            f"{old[metric]} -> {stats[metric]}"
+                        )
+        for line in regressions:
+            self.stderr.write(self.style.ERROR(f"Regression: {line}"))
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} metrics regressed more than "
+                f"{threshold:.0%} over {path}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"No regressions over {path}"))
@@ -0,0 +1,133 @@
+"""
+Django command comparing the recipe list serializer with the row fast path
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Prefetch
+
+from core.benchmark import best_of
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.rows import (
+    recipe_rows,
+    represent_rows,
+)
+from recipe.serializers import RecipeSerializer
+
+BENCHMARK_EMAIL = "benchmark-recipe-list@example.com"
+
+
+def add_recipes(user, start, stop, tags, ingredients):
+    """Create recipes start..stop each linked to 3 tags, 5 ingredients"""
+    recipes = Recipe.objects.bulk_create(
+        (
+            Recipe(
+                user=user,
+                title=f"Recipe {i}",
+                time_minutes=i % 120,
+                price=Decimal(i % 5000) / 100,
+                link=f"https://example.com/{i}" if i % 2 else "",
+            )
+            for i in range(start, stop)
+        ),
+        batch_size=5000,
+    )
+    Recipe.tags.through.objects.bulk_create(
+        (
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for i, recipe in enumerate(recipes)
+            for tag in tags[i % 17:i % 17 + 3]
+        ),
+        batch_size=10000,
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        (
+            Recipe.ingredients.through(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient.id,
+            )
+            for i, recipe in enumerate(recipes)
+            for ingredient in ingredients[i % 45:i % 45 + 5]
+        ),
+        batch_size=10000,
+    )
+
+
+class Command(BaseCommand):
+    """Time serializing recipe lists from instances and from rows."""
+
+    help = (
+        "Time RecipeSerializer against the .values() list path. Rows are "
+        "created in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[10, 1000, 50000],
+            help="Recipe counts to benchmark.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per measurement, the best one is reported.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                BENCHMARK_EMAIL,
+                "benchmark-pass",
+            )
+            tags = Tag.objects.bulk_create(
+                Tag(user=user, name=f"Tag {i}") for i in range(20)
+            )
+            ingredients = Ingredient.objects.bulk_create(
+                Ingredient(user=user, name=f"Ingredient {i}")
+                for i in range(50)
+            )
+            created = 0
+            for count in sorted(options["rows"]):
+                add_recipes(user, created, count, tags, ingredients)
+                created = max(created, count)
+                self._report(user, count, options["repeat"])
+            transaction.set_rollback(True)
+
+    def _report(self, user, count, repeat):
+        """Time both list paths over the user's first count recipes"""
+        queryset = Recipe.objects.filter(user=user).order_by("-id")[:count]
+
+        def serializer_path():
+            return RecipeSerializer(
+                queryset.prefetch_related(
+                    Prefetch("tags", queryset=Tag.objects.order_by("id")),
+                    Prefetch(
+                        "ingredients",
+                        queryset=Ingredient.objects.order_by("id"),
+                    ),
+                ),
+                many=True,
+            ).data
+
+        def rows_path():
+            return represent_rows(recipe_rows(queryset))
+
+        serializer_time, expected = best_of(serializer_path, repeat)
+        rows_time, data = best_of(rows_path, repeat)
+        if data != expected:
+            raise CommandError(f"Row output differs at {count} rows")
+        self.stdout.write(
+            f"{count:>8} rows  serializer {serializer_time * 1000:9.1f} ms"
+            f"  rows {rows_time * 1000:9.1f} ms"
+            f"  speedup {serializer_time / rows_time:5.2f}x"
+        )
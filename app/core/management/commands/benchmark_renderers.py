@@ -0,0 +1,100 @@
+"""
+Django command comparing the stdlib and fast JSON renderers
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmark import best_of
+from core.renderers import (
+    FastJSONParser,
+    FastJSONRenderer,
+    fast_json_enabled,
+)
+
+
+def recipe_page(count):
+    """Return a recipe list page shaped like the API's list response"""
+    now = timezone.now()
+    return {
+        "next": "http://localhost/api/recipe/recipes/?cursor=cD0xMjM0",
+        "previous": None,
+        "results": [
+            {
+                "id": i,
+                "title": f"Recipe number {i} with a longer title",
+                "time_minutes": i % 120,
+                "price": Decimal(i % 5000) / 100,
+                "link": f"https://example.com/recipes/{i}.pdf",
+                "updated_at": now - timedelta(minutes=i),
+                "tags": [
+                    {"id": t, "name": f"Tag {t}"} for t in range(i % 4)
+                ],
+                "ingredients": [
+                    {"id": n, "name": f"Ingredient {n}"}
+                    for n in range(i % 7)
+                ],
+            }
+            for i in range(count)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    """Time rendering and parsing recipe lists with both JSON backends."""
+
+    help = "Time JSONRenderer against FastJSONRenderer on recipe lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000, 10000],
+            help="Recipes per rendered page.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs per measurement, the best one is reported.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if not fast_json_enabled():
+            raise CommandError("orjson is not installed or API_FAST_JSON=0")
+        repeat = options["repeat"]
+        for count in options["rows"]:
+            data = recipe_page(count)
+            stdlib_time, expected = best_of(
+                lambda: JSONRenderer().render(data), repeat,
+            )
+            fast_time, content = best_of(
+                lambda: FastJSONRenderer().render(data), repeat,
+            )
+            if content != expected:
+                raise CommandError(f"Rendered output differs at {count} rows")
+            parse_time, _ = best_of(
+                lambda: self._parse(content), repeat,
+            )
+            with override_settings(API_FAST_JSON=False):
+                stdlib_parse_time, _ = best_of(
+                    lambda: self._parse(content), repeat,
+                )
+            self.stdout.write(
+                f"{count:>6} rows {len(content):>10} bytes"
+                f"  render {stdlib_time * 1000:8.2f} ->"
+                f" {fast_time * 1000:7.2f} ms"
+                f"  parse {stdlib_parse_time * 1000:8.2f} ->"
+                f" {parse_time * 1000:7.2f} ms"
+            )
+
+    def _parse(self, content):
+        """Parse content with FastJSONParser"""
+        return FastJSONParser().parse(BytesIO(content))
@@ -0,0 +1,69 @@
+"""
+Django command exporting a user's recipes, tags and ingredients
+"""
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from core import transfer
+
+
+class Command(BaseCommand):
+    """Stream a user's recipes as NDJSON or a directory of CSV files."""
+
+    help = (
+        "Export a user's tags, ingredients and recipes with their links. "
+        "Image files are not copied, only their paths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="Email of the user to export.")
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            default="ndjson",
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="NDJSON file (- for stdout) or directory for CSV files.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Write CSV row by row instead of with COPY.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        output = options["output"]
+        chunk_size = options["chunk_size"]
+        if options["format"] == "csv":
+            if output == "-":
+                raise CommandError("CSV exports need an --output directory")
+            transfer.export_csv(
+                user,
+                output,
+                self.stderr.write,
+                chunk_size=chunk_size,
+                use_copy=transfer.copy_available() and not options["no_copy"],
+            )
+        elif output == "-":
+            transfer.export_ndjson(
+                user,
+                lambda text: self.stdout.write(text, ending=""),
+                self.stderr.write,
+                chunk_size=chunk_size,
+            )
+        else:
+            with open(output, "w", encoding="utf-8") as handle:
+                transfer.export_ndjson(
+                    user,
+                    handle.write,
+                    self.stderr.write,
+                    chunk_size=chunk_size,
+                )
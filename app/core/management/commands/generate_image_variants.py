@@ -0,0 +1,45 @@
+"""
+Django command generating resized variants of existing recipe images
+"""
+from django.core.management import BaseCommand
+
+from core.models import Recipe
+from recipe.images import process_image
+
+
+class Command(BaseCommand):
+    """Backfill or rebuild the JPEG/WebP variants of recipe images."""
+
+    help = (
+        "Generate the IMAGE_VARIANT_WIDTHS x IMAGE_VARIANT_FORMATS variants "
+        "of recipe images that have none yet, e.g. uploaded before variants "
+        "existed or lost with a worker that stopped. Originals are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild variants of every image, e.g. after changing the "
+                 "widths or formats.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        recipes = Recipe.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["all"]:
+            recipes = recipes.filter(image_variants__isnull=True)
+        done = failed = 0
+        for recipe_id, image_name in recipes.order_by("id").values_list(
+            "id", "image",
+        ).iterator():
+            try:
+                process_image(recipe_id, image_name)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Recipe {recipe_id}: {exc!r}")
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {done} images, {failed} failed."
+        ))
@@ -0,0 +1,68 @@
+"""
+Django command importing recipes, tags and ingredients for a user
+"""
+import os
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from core import transfer
+from recipe.cache import bump_list_version
+
+
+class Command(BaseCommand):
+    """Load an export_recipes NDJSON file or CSV directory for a user."""
+
+    help = (
+        "Import tags, ingredients and recipes exported by export_recipes. "
+        "Tags and ingredients are matched by name, recipes are added."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="Email of the receiving user.")
+        parser.add_argument(
+            "input",
+            help="NDJSON file (- for stdin) or CSV export directory.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Load CSV with chunked bulk inserts instead of COPY.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        path = options["input"]
+        importer = transfer.Importer(
+            user,
+            self.stderr.write,
+            chunk_size=options["chunk_size"],
+        )
+        with transaction.atomic():
+            if os.path.isdir(path):
+                if transfer.copy_available() and not options["no_copy"]:
+                    transfer.copy_csv(user, path, self.stderr.write)
+                else:
+                    importer.load_csv(path)
+            elif path == "-":
+                self._load_ndjson(importer, sys.stdin)
+            else:
+                with open(path, encoding="utf-8") as handle:
+                    self._load_ndjson(importer, handle)
+            # Bulk inserts send no signals, drop the cached lists here
+            bump_list_version(user.id)
+        self.stdout.write(self.style.SUCCESS("Import finished."))
+
+    def _load_ndjson(self, importer, lines):
+        """Load NDJSON lines, reporting malformed records as errors"""
+        try:
+            importer.load_ndjson(lines)
+        except (KeyError, ValueError) as exc:
+            raise CommandError(f"Invalid NDJSON export: {exc}")
@@ -0,0 +1,169 @@
+"""
+Django command reclaiming space in the recipe image storage
+"""
+import posixpath
+import time
+from collections import Counter
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Recipe, StoredImage
+from core.storage import collect, image_storage, is_hashed
+from recipe.images import variant_names
+
+UPLOAD_DIR = "uploads/recipe"
+
+
+def recipe_images(recipe):
+    """Return every stored name a recipe uses, once per reference"""
+    names = variant_names(recipe.image_variants)
+    if recipe.image:
+        names.append(recipe.image.name)
+    return names
+
+
+def walk(storage, directory):
+    """Yield the names of every file below directory"""
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+class Command(BaseCommand):
+    """Deduplicate, recount and sweep the recipe image storage."""
+
+    help = (
+        "Move images stored under random names to content hashed names, "
+        "so duplicates share one file, recount references from the recipes "
+        "and delete files no recipe uses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be reclaimed without changing anything.",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help="Seconds a file must exist before it counts as orphaned, "
+                 "protects uploads that are not committed yet.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        dry_run = options["dry_run"]
+        self.cutoff = time.time() - options["min_age"]
+        moved = self._rehash(dry_run)
+        fixed, counts, unused = self._recount(dry_run)
+        orphans = list(dict.fromkeys(unused + [
+            name for name in walk(image_storage, UPLOAD_DIR)
+            if name not in counts and self._old(name)
+        ]))
+        size = sum(
+            image_storage.size(name) for name in orphans
+            if image_storage.exists(name)
+        )
+        if not dry_run:
+            orphans = collect(orphans)
+        verb = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(
+            f"{moved} legacy images {'to move' if dry_run else 'moved'}, "
+            f"{fixed} reference counts {'wrong' if dry_run else 'fixed'}."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(orphans)} orphaned files, "
+            f"{size / 1024 / 1024:.1f} MiB."
+        ))
+
+    def _old(self, name):
+        """Return True for files missing or older than --min-age"""
+        if not image_storage.exists(name):
+            return True
+        modified = image_storage.get_modified_time(name).timestamp()
+        return modified < self.cutoff
+
+    def _rehash(self, dry_run):
+        """Move files with random names to their content hashed names"""
+        recipes = Recipe.objects.exclude(
+            image__isnull=True,
+            image_variants__isnull=True,
+        ).only("id", "image", "image_variants")
+        renamed = {}
+        for recipe in recipes.iterator():
+            legacy = [
+                name for name in recipe_images(recipe)
+                if not is_hashed(name) and image_storage.exists(name)
+            ]
+            if not legacy or dry_run:
+                renamed.update(dict.fromkeys(legacy))
+                continue
+            for name in legacy:
+                if renamed.get(name) is None:
+                    with image_storage.open(name) as handle:
+                        renamed[name] = image_storage.save(name, handle)
+            self._rename(recipe, renamed)
+        return len(renamed)
+
+    def _rename(self, recipe, renamed):
+        """Point a recipe's image and variants at their new names"""
+        image = recipe.image.name if recipe.image else None
+        variants = {
+            width: {
+                name: renamed.get(path, path)
+                for name, path in formats.items()
+            }
+            for width, formats in (recipe.image_variants or {}).items()
+        } or None
+        # Only these columns, a full save() would bump updated_at
+        Recipe.objects.filter(pk=recipe.pk, image=image).update(
+            image=renamed.get(image, image),
+            image_variants=variants,
+        )
+
+    def _recount(self, dry_run):
+        """Set reference counts from the recipes
+
+        Returns the number of wrong counts, the counts and the names of
+        unreferenced rows. Recently saved files may belong to uploads that
+        are not recorded yet, their rows are left alone.
+        """
+        with transaction.atomic():
+            if not dry_run:
+                # Waits for uploads in flight, blocks new ones until done
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"LOCK TABLE {StoredImage._meta.db_table} "
+                        f"IN EXCLUSIVE MODE"
+                    )
+            counts = Counter()
+            recipes = Recipe.objects.only("id", "image", "image_variants")
+            for recipe in recipes.iterator():
+                counts.update(recipe_images(recipe))
+            rows = dict(StoredImage.objects.values_list("name", "ref_count"))
+            wrong = {
+                name: count for name, count in counts.items()
+                if rows.get(name) != count
+            }
+            unused = [
+                name for name in rows
+                if name not in counts and self._old(name)
+            ]
+            if not dry_run:
+                StoredImage.objects.filter(name__in=wrong).delete()
+                StoredImage.objects.bulk_create(
+                    StoredImage(name=name, ref_count=count)
+                    for name, count in wrong.items()
+                )
+                StoredImage.objects.filter(name__in=unused).update(
+                    ref_count=0,
+                )
+        fixed = len(wrong) + sum(1 for name in unused if rows[name])
+        return fixed, counts, unused
@@ -0,0 +1,312 @@
+"""
+Django command generating large, realistic data sets for benchmarking
+"""
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand
+from django.db import connection
+from django.db.models import F
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+# Fixed so the same seed always gives the same timestamps
+SEED_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+TAG_WORDS = [
+    "Vegan", "Vegetarian", "Quick", "Dinner", "Lunch", "Breakfast",
+    "Dessert", "Spicy", "Healthy", "Comfort", "Italian", "Mexican",
+    "Indian", "Thai", "Baking", "Grill", "Soup", "Salad", "Budget",
+    "Party",
+]
+INGREDIENT_WORDS = [
+    "Salt", "Pepper", "Garlic", "Onion", "Tomato", "Olive oil", "Butter",
+    "Flour", "Sugar", "Egg", "Milk", "Rice", "Chicken", "Beef", "Lemon",
+    "Basil", "Cheese", "Potato", "Carrot", "Chili", "Ginger", "Cumin",
+    "Yogurt", "Beans", "Spinach",
+]
+TITLE_WORDS = [
+    "Roasted", "Creamy", "Crispy", "Slow cooked", "Grilled", "Baked",
+    "Stuffed", "Smoky", "Zesty", "Classic", "Easy", "Weeknight",
+]
+DISHES = [
+    "pasta", "curry", "stew", "tacos", "soup", "salad", "risotto", "pie",
+    "noodles", "bowl", "bake", "stir fry", "burger", "pancakes",
+]
+
+
+def skewed_count(rng, mean, alpha=1.5):
+    """Draw a Pareto distributed count with roughly the given mean"""
+    if mean <= 0:
+        return 0
+    value = rng.paretovariate(alpha) * mean * (alpha - 1) / alpha
+    return min(int(value), mean * 50)
+
+
+def zipf_weights(size, exponent=1.1):
+    """Return cumulative Zipf weights so a few items are picked most"""
+    total = 0
+    weights = []
+    for rank in range(1, size + 1):
+        total += 1 / rank ** exponent
+        weights.append(total)
+    return weights
+
+
+class TableWriter:
+    """Buffer rows for one table and insert them in chunks"""
+
+    def __init__(self, model, columns, use_copy):
+        self.model = model
+        self.columns = columns
+        self.use_copy = use_copy
+        self.rows = []
+        self.total = 0
+
+    def add(self, row):
+        """Buffer a row of values in column order"""
+        self.rows.append(row)
+
+    def flush(self):
+        """Insert the buffered rows with COPY or batched INSERTs"""
+        if not self.rows:
+            return
+        table = self.model._meta.db_table
+        columns = ", ".join(self.columns)
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                buffer = io.StringIO()
+                for row in self.rows:
+                    buffer.write("\t".join(
+                        r"\N" if value is None else str(value)
+                        for value in row
+                    ))
+                    buffer.write("\n")
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {table} ({columns}) FROM STDIN",
+                    buffer,
+                )
+            else:
+                # Raw INSERTs, bulk_create would reset the auto_now fields
+                placeholders = ", ".join(["%s"] * len(self.columns))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({columns}) "
+                    f"VALUES ({placeholders})",
+                    self.rows,
+                )
+        self.total += len(self.rows)
+        self.rows = []
+
+
+class Command(BaseCommand):
+    """Seed users, recipes, tags, ingredients and links at scale."""
+
+    help = (
+        "Generate benchmark data with skewed per-user sizes and Zipf "
+        "distributed tag and ingredient popularity. The same seed gives "
+        "the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=200,
+            help="Mean recipes per user.",
+        )
+        parser.add_argument(
+            "--tags",
+            type=int,
+            default=30,
+            help="Mean tags per user.",
+        )
+        parser.add_argument(
+            "--ingredients",
+            type=int,
+            default=80,
+            help="Mean ingredients per user.",
+        )
+        parser.add_argument("--tags-per-recipe", type=int, default=3)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50000,
+            help="Rows buffered before they are inserted.",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Insert with batched INSERTs instead of COPY.",
+        )
+        parser.add_argument(
+            "--skip-triggers",
+            action="store_true",
+            help="Skip foreign key checks and the search trigger while "
+                 "loading, about twice as fast. Needs a superuser, search "
+                 "vectors are filled in afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        use_copy = connection.vendor == "postgresql" and not options["no_copy"]
+        recipe_tags = Recipe.tags.through
+        recipe_ingredients = Recipe.ingredients.through
+        # Parents first, so every chunk of links finds its rows
+        self.writers = {
+            Tag: TableWriter(Tag, (
+                "id", "user_id", "name", "created_at", "updated_at",
+            ), use_copy),
+            Ingredient: TableWriter(Ingredient, (
+                "id", "user_id", "name", "created_at", "updated_at",
+            ), use_copy),
+            Recipe: TableWriter(Recipe, (
+                "id", "user_id", "title", "description", "time_minutes",
+                "price", "link", "image", "created_at", "updated_at",
+            ), use_copy),
+            recipe_tags: TableWriter(
+                recipe_tags, ("recipe_id", "tag_id"), use_copy,
+            ),
+            recipe_ingredients: TableWriter(
+                recipe_ingredients, ("recipe_id", "ingredient_id"), use_copy,
+            ),
+        }
+        start = time.perf_counter()
+        users = self._create_users(options["users"], options["seed"])
+        if options["skip_triggers"]:
+            self._set_replication_role("replica")
+        try:
+            for number, user in enumerate(users, 1):
+                self._seed_user(user)
+                if sum(len(w.rows) for w in self.writers.values()) >= \
+                        options["chunk_size"]:
+                    self._flush()
+                    self._report(number, len(users), start)
+            self._flush()
+        finally:
+            if options["skip_triggers"]:
+                self._set_replication_role("DEFAULT")
+        if options["skip_triggers"]:
+            # Setting title fires the search trigger for the new rows
+            Recipe.objects.filter(
+                user__in=users,
+                search_vector__isnull=True,
+            ).update(title=F("title"))
+        self._report(len(users), len(users), start)
+        self.stdout.write(self.style.SUCCESS("Benchmark data created."))
+
+    def _set_replication_role(self, role):
+        """Turn triggers, foreign key checks included, off or back on"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET session_replication_role = {role}")
+
+    def _create_users(self, count, seed):
+        """Create the benchmark users, sharing one password hash"""
+        password = make_password("benchpass123")
+        return get_user_model().objects.bulk_create(
+            get_user_model()(
+                email=f"bench-{seed}-{i}@example.com",
+                name=f"Benchmark user {i}",
+                password=password,
+            )
+            for i in range(count)
+        )
+
+    def _allocate_ids(self, model, count):
+        """Reserve count ids from the model's sequence, return the first"""
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                "nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+                [table, table, count],
+            )
+            return cursor.fetchone()[0] - count + 1
+
+    def _named_rows(self, model, user, words, mean):
+        """Queue a skewed number of uniquely named rows, return their ids"""
+        count = max(1, skewed_count(self.rng, mean))
+        first = self._allocate_ids(model, count)
+        ids = list(range(first, first + count))
+        for i, row_id in enumerate(ids):
+            name = words[i % len(words)]
+            if i >= len(words):
+                name = f"{name} {i // len(words) + 1}"
+            created = self._timestamp()
+            self.writers[model].add((row_id, user.id, name, created, created))
+        return ids
+
+    def _timestamp(self):
+        """Return a creation time within two years before SEED_EPOCH"""
+        return SEED_EPOCH - timedelta(seconds=self.rng.randrange(63072000))
+
+    def _seed_user(self, user):
+        """Queue one user's tags, ingredients, recipes and links"""
+        rng = self.rng
+        options = self.options
+        tag_ids = self._named_rows(Tag, user, TAG_WORDS, options["tags"])
+        ingredient_ids = self._named_rows(
+            Ingredient, user, INGREDIENT_WORDS, options["ingredients"],
+        )
+        tag_weights = zipf_weights(len(tag_ids))
+        ingredient_weights = zipf_weights(len(ingredient_ids))
+        count = skewed_count(rng, options["recipes"])
+        if not count:
+            return
+        first = self._allocate_ids(Recipe, count)
+        links = (
+            (Recipe.tags.through, tag_ids, tag_weights,
+             options["tags_per_recipe"]),
+            (Recipe.ingredients.through, ingredient_ids, ingredient_weights,
+             options["ingredients_per_recipe"]),
+        )
+        for recipe_id in range(first, first + count):
+            created = self._timestamp()
+            self.writers[Recipe].add((
+                recipe_id,
+                user.id,
+                f"{rng.choice(TITLE_WORDS)} {rng.choice(DISHES)}",
+                "",
+                rng.choice((5, 10, 15, 20, 30, 45, 60, 90, 120)),
+                f"{rng.randrange(100, 5000) / 100:.2f}",
+                "",
+                None,
+                created,
+                created,
+            ))
+            for through, ids, weights, mean in links:
+                picked = set(rng.choices(
+                    ids,
+                    cum_weights=weights,
+                    k=rng.randint(0, 2 * mean),
+                ))
+                writer = self.writers[through]
+                for linked_id in picked:
+                    writer.add((recipe_id, linked_id))
+
+    def _flush(self):
+        """Insert every buffered row, parents before links"""
+        for writer in self.writers.values():
+            writer.flush()
+
+    def _report(self, done, total, start):
+        """Write progress and insert throughput"""
+        elapsed = time.perf_counter() - start
+        rows = sum(writer.total for writer in self.writers.values())
+        self.stdout.write(
+            f"{done}/{total} users, {rows} rows in {elapsed:.1f}s "
+            f"({rows / elapsed if elapsed else 0:,.0f} rows/s)"
+        )
@@ -0,0 +1,105 @@
+"""
+Prometheus metrics for the API, shared by every uWSGI worker
+
+With PROMETHEUS_MULTIPROC_DIR set (scripts/run.sh does) every worker
+writes its values to memory mapped files in that directory and the
+metrics view adds them up.
+"""
+import atexit
+import os
+import time
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUESTS = Counter(
+    "django_http_requests_total",
+    "Requests by resolved route, method and status code.",
+    ["route", "method", "status"],
+)
+LATENCY = Histogram(
+    "django_http_request_duration_seconds",
+    "Request latency by resolved route and method.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "django_http_request_db_queries",
+    "Database queries per request by resolved route and method.",
+    ["route", "method"],
+    buckets=QUERY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "django_http_request_db_duration_seconds",
+    "Time spent in database queries per request.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "django_http_requests_in_flight",
+    "Requests being processed.",
+    multiprocess_mode="livesum",
+)
+
+
+def multiprocess_dir():
+    """Return the shared metrics directory, None in single process mode"""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def registry():
+    """Return the registry to expose, aggregating workers if shared"""
+    if not multiprocess_dir():
+        return REGISTRY
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+@atexit.register
+def _mark_worker_dead():
+    """Drop a stopped worker's live gauges from the shared directory"""
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """Record request counts, latency and DB use per route
+
+    Place it right after ServerTimingMiddleware, the query counts are
+    read from request.timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        match = request.resolver_match
+        # Route names keep label values bounded, unlike raw paths
+        route = match.view_name if match else "unresolved"
+        method = request.method
+        REQUESTS.labels(route, method, response.status_code).inc()
+        LATENCY.labels(route, method).observe(time.perf_counter() - start)
+        timing = getattr(request, "timing", None)
+        if timing is not None:
+            DB_QUERIES.labels(route, method).observe(timing.db.count)
+            DB_DURATION.labels(route, method).observe(timing.db.duration)
+        return response
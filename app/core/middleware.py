@@ -0,0 +1,106 @@
+"""
+Middleware measuring database, view and render time of each request
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("core.timing")
+
+
+class QueryTimer:
+    """Execute wrapper counting queries and the time spent running them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class RequestTiming:
+    """Timestamps of one request, exposed as request.timing"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_start = None
+        self.view_end = None
+        self.end = None
+        self.db = QueryTimer()
+
+    def metrics(self):
+        """Return the measured durations in milliseconds"""
+        end = self.end or time.perf_counter()
+        view_start = self.view_start or self.start
+        # Responses without a template step have no separate render time
+        view_end = self.view_end or end
+        return {
+            "db_queries": self.db.count,
+            "db_ms": round(self.db.duration * 1000, 2),
+            "view_ms": round((view_end - view_start) * 1000, 2),
+            "render_ms": round((end - view_end) * 1000, 2),
+            "total_ms": round((end - self.start) * 1000, 2),
+        }
+
+    def header(self):
+        """Return the metrics as a Server-Timing header value"""
+        metrics = self.metrics()
+        queries = metrics["db_queries"]
+        return ", ".join([
+            f'db;dur={metrics["db_ms"]};desc="{queries} queries"',
+            f'view;dur={metrics["view_ms"]}',
+            f'render;dur={metrics["render_ms"]}',
+            f'total;dur={metrics["total_ms"]}',
+        ])
+
+
+class ServerTimingMiddleware:
+    """Report DB, view and render time in a Server-Timing header
+
+    Keep it first in MIDDLEWARE so the total covers the other middleware.
+    The header is only sent with SERVER_TIMING_HEADER, with
+    SERVER_TIMING_LOG the metrics are logged to core.timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing.db))
+            response = self.get_response(request)
+        timing.end = time.perf_counter()
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timing.header()
+        if settings.SERVER_TIMING_LOG:
+            fields = {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                **timing.metrics(),
+            }
+            logger.info(
+                " ".join(f"{key}={value}" for key, value in fields.items()),
+                extra={"timing": fields},
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Mark the start of the view, after the request middleware"""
+        request.timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        """Mark the end of the view, DRF responses are rendered next"""
+        request.timing.view_end = time.perf_counter()
+        return response
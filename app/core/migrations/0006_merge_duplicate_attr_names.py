@@ -0,0 +1,43 @@
+# Generated by Django 4.0.10 on 2026-10-17 04:00
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold duplicate (user, name) tags and ingredients into the oldest row"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        fk = f'{model_name.lower()}_id'
+        duplicates = (
+            model.objects.values('user_id', 'name')
+            .annotate(keep_id=Min('id'), total=Count('id'))
+            .filter(total__gt=1)
+        )
+        for dup in duplicates:
+            drop_ids = list(
+                model.objects.filter(user_id=dup['user_id'], name=dup['name'])
+                .exclude(id=dup['keep_id'])
+                .values_list('id', flat=True)
+            )
+            linked = through.objects.filter(**{fk: dup['keep_id']})
+            for drop_id in drop_ids:
+                moved = through.objects.filter(**{fk: drop_id})
+                moved.filter(
+                    recipe_id__in=linked.values('recipe_id')
+                ).delete()
+                moved.update(**{fk: dup['keep_id']})
+            model.objects.filter(id__in=drop_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
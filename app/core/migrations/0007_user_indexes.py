@@ -0,0 +1,25 @@
+# Generated by Django 4.0.10 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_merge_duplicate_attr_names'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_name_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.0.10 on 2026-10-17 04:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.db import migrations
+
+RECIPE_SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'B')
+"""
+
+CREATE_TRIGGER = f"""
+CREATE FUNCTION core_recipe_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {RECIPE_SEARCH_VECTOR.format(row='NEW.')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON core_recipe
+    FOR EACH ROW EXECUTE PROCEDURE core_recipe_search_vector_update();
+
+UPDATE core_recipe SET search_vector = {RECIPE_SEARCH_VECTOR.format(row='')};
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS core_recipe_search_vector_trigger ON core_recipe;
+DROP FUNCTION IF EXISTS core_recipe_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_user_indexes'),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'search_vector'], name='recipe_user_search_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.0.10 on 2026-10-17 04:11
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'name'], name='ingredient_user_name_trgm_idx', opclasses=['int8_ops', 'gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'name'], name='tag_user_name_trgm_idx', opclasses=['int8_ops', 'gin_trgm_ops']),
+        ),
+    ]
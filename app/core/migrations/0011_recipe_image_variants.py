@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-17 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.JSONField(editable=False, null=True),
+        ),
+    ]
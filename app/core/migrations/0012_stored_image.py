@@ -0,0 +1,48 @@
+# Generated by Django 4.0.10 on 2026-10-17 04:58
+
+import core.models
+import core.storage
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """Count the files existing recipes use, images and variants"""
+    Recipe = apps.get_model('core', 'Recipe')
+    StoredImage = apps.get_model('core', 'StoredImage')
+    counts = Counter()
+    rows = Recipe.objects.values_list('image', 'image_variants')
+    for image, variants in rows.iterator():
+        if image:
+            counts[image] += 1
+        for formats in (variants or {}).values():
+            counts.update(formats.values())
+    StoredImage.objects.bulk_create(
+        StoredImage(name=name, ref_count=count)
+        for name, count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,10 @@
 """
 Database models
 """
-import uuid
 import os
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -11,11 +12,13 @@ from django.contrib.auth.models import (
 )
 from django.conf import settings
 
+from core.storage import image_storage
+
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image"""
+    # The storage names the file by its content hash, only ext is kept
     ext = os.path.splitext(filename)[1]
-    file_name = f'{uuid.uuid4()}{ext}'
-    return os.path.join('uploads', 'recipe', file_name)
+    return os.path.join('uploads', 'recipe', f'image{ext}')
 
 class UserManager(BaseUserManager):
     """Manager for users"""
@@ -61,7 +64,31 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
     ingredients = models.ManyToManyField("Ingredient")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=image_storage,
+    )
+    # {width: {format: storage name}}, filled in after upload by
+    # recipe.images, None while pending or without an image
+    image_variants = models.JSONField(null=True, editable=False)
+    # Maintained by a database trigger from title and description
+    search_vector = SearchVectorField(null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Also touched when tags or ingredients are linked, renamed or deleted
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-id"],
+                name="recipe_user_id_desc_idx",
+            ),
+            GinIndex(
+                fields=["user", "search_vector"],
+                name="recipe_user_search_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -73,6 +100,23 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="unique_tag_name_per_user",
+            ),
+        ]
+        indexes = [
+            GinIndex(
+                fields=["user", "name"],
+                name="tag_user_name_trgm_idx",
+                opclasses=["int8_ops", "gin_trgm_ops"],
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -84,6 +128,35 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
         )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"],
+                name="unique_ingredient_name_per_user",
+            ),
+        ]
+        indexes = [
+            GinIndex(
+                fields=["user", "name"],
+                name="ingredient_user_name_trgm_idx",
+                opclasses=["int8_ops", "gin_trgm_ops"],
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class StoredImage(models.Model):
+    """A file in the recipe image storage and how many references it has
+
+    Counted per use: a recipe's image and each of its variants.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
@@ -0,0 +1,112 @@
+"""
+Middleware profiling single requests with cProfile
+
+Staff users profile a request by sending an X-Profile header or a
+?profile=1 query flag, PROFILE_SAMPLE_RATE profiles a fraction of all
+requests. Profiles are written to PROFILE_ROOT as pstats files, open them
+with `python -m pstats` or snakeviz.
+"""
+import cProfile
+import logging
+import os
+import random
+import time
+import uuid
+
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+logger = logging.getLogger("core.profiling")
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAM = "profile"
+FALSE_VALUES = ("", "0", "false", "no")
+
+
+def requested(request):
+    """Return True when the request asks to be profiled"""
+    value = request.META.get(PROFILE_HEADER)
+    if value is None:
+        value = request.GET.get(PROFILE_PARAM)
+    return value is not None and value.lower() not in FALSE_VALUES
+
+
+def is_staff(request, view_func):
+    """Return True when the request is made by a staff user
+
+    API views authenticate inside the view, so their authentication
+    classes are run here. Only done for requests asking to be profiled.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    classes = getattr(
+        getattr(view_func, "cls", None), "authentication_classes", None,
+    )
+    if not classes:
+        return False
+    drf_request = Request(
+        request,
+        authenticators=[authentication() for authentication in classes],
+    )
+    try:
+        return drf_request.user.is_staff
+    except exceptions.APIException:
+        return False
+
+
+def profile_path(request):
+    """Return a new pstats file path named after the request's route"""
+    match = request.resolver_match
+    route = match.view_name.replace(":", "-") if match else "unresolved"
+    name = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{route}-"
+        f"{request.method.lower()}-{uuid.uuid4().hex[:8]}.prof"
+    )
+    return os.path.join(settings.PROFILE_ROOT, name)
+
+
+class ProfilingMiddleware:
+    """Run cProfile around the view and response rendering
+
+    Keep it last in MIDDLEWARE so the profile only covers the view. When
+    a request is not profiled the cost is a header lookup and, with
+    sampling on, one random number.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        profiler = getattr(request, "profiler", None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        path = profile_path(request)
+        os.makedirs(settings.PROFILE_ROOT, exist_ok=True)
+        profiler.dump_stats(path)
+        logger.info("Profiled %s %s to %s", request.method, request.path, path)
+        if request.profile_requested:
+            response["X-Profile"] = os.path.basename(path)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Start profiling when asked by staff or sampled"""
+        request.profile_requested = (
+            requested(request) and is_staff(request, view_func)
+        )
+        rate = settings.PROFILE_SAMPLE_RATE
+        if not request.profile_requested and not (
+            rate and random.random() < rate
+        ):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this thread
+            return None
+        request.profiler = profiler
+        return None
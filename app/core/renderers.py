@@ -0,0 +1,72 @@
+"""
+JSON renderer and parser backed by orjson, falling back to the stdlib
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+# Encodes the types orjson leaves out the way JSONRenderer does
+_encoder = encoders.JSONEncoder()
+
+
+def fast_json_enabled():
+    """Return True when orjson is installed and not switched off"""
+    return orjson is not None and getattr(settings, "API_FAST_JSON", True)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Render JSON with orjson, output matching JSONRenderer
+
+    Decimals, datetimes, UUIDs and lazy strings go through DRF's encoder
+    so they are written exactly as the stdlib renderer writes them.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON bytes"""
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if not fast_json_enabled() or indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Non str keys, e.g. the int indexes of ListField errors, are
+            # written as strings like json.dumps writes them
+            ret = orjson.dumps(
+                data,
+                default=_encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the stdlib can write
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by JSONRenderer as they are line breaks in JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028")
+            ret = ret.replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """Parse UTF-8 JSON request bodies with orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON"""
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        utf8 = encoding.lower() in ("utf-8", "utf8")
+        if not fast_json_enabled() or not utf8:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,30 @@
+"""
+Signal handlers keeping cached token authentication fresh
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token
+
+
+def invalidate_user_tokens(sender, instance, created=False, **kwargs):
+    """Drop cached users on any save, e.g. deactivation or a new password"""
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        "key",
+        flat=True,
+    ):
+        invalidate_token(key)
+
+
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Drop the cached user of a deleted token"""
+    invalidate_token(instance.key)
+
+
+def connect():
+    """Connect cache invalidation to user saves and token deletes"""
+    post_save.connect(invalidate_user_tokens, sender=get_user_model())
+    post_delete.connect(invalidate_deleted_token, sender=Token)
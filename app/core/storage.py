@@ -0,0 +1,140 @@
+"""
+Content addressed, reference counted storage for recipe images
+
+Files are named by the SHA-256 of their content, so an image uploaded
+twice is stored once. Every save takes a reference in StoredImage and
+every row that stops using a file releases one. A file is deleted when
+its count drops to zero and the release commits.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.utils.deconstruct import deconstructible
+
+# Matches the names save() gives, e.g. uploads/recipe/ab/ab12...ef.jpg
+HASHED_NAME = re.compile(r"(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}\.\w+$")
+
+
+def stored_images():
+    """Return the StoredImage model, core.models imports this module"""
+    return apps.get_model("core", "StoredImage")
+
+
+def content_digest(content):
+    """Return the SHA-256 hex digest of a file, rewound before and after"""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def is_hashed(name):
+    """Return True for names given by ContentAddressedStorage"""
+    return bool(HASHED_NAME.search(name))
+
+
+def acquire(names):
+    """Take one reference on each name, one per occurrence"""
+    names = [name for name in names if name]
+    if not names:
+        return
+    table = stored_images()._meta.db_table
+    with connection.cursor() as cursor:
+        # Sorted, so concurrent batches lock shared rows in the same order
+        cursor.execute(
+            f"INSERT INTO {table} (name, ref_count) "
+            f"SELECT name, count(*) FROM unnest(%s::text[]) AS name "
+            f"GROUP BY name ORDER BY name "
+            f"ON CONFLICT (name) DO UPDATE "
+            f"SET ref_count = {table}.ref_count + EXCLUDED.ref_count",
+            [names],
+        )
+
+
+def release(names):
+    """Drop one reference per name, deleting unused files on commit"""
+    names = [name for name in names if name]
+    if not names:
+        return
+    table = stored_images()._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} "
+            f"SET ref_count = GREATEST({table}.ref_count - released.n, 0) "
+            f"FROM (SELECT name, count(*) AS n FROM unnest(%s::text[]) "
+            f"AS name GROUP BY name) AS released "
+            f"WHERE {table}.name = released.name",
+            [names],
+        )
+    transaction.on_commit(lambda: collect(names))
+
+
+def collect(names):
+    """Delete the files among names that no row references, return them
+
+    Names without a StoredImage row are unreferenced too. The deleted rows
+    stay locked until the files are gone, so a concurrent save of the same
+    content waits and then writes the file again.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    if not names:
+        return []
+    table = stored_images()._meta.db_table
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} "
+                f"WHERE name = ANY(%s) AND ref_count <= 0",
+                [names],
+            )
+            cursor.execute(
+                f"SELECT name FROM {table} WHERE name = ANY(%s)",
+                [names],
+            )
+            kept = {name for name, in cursor.fetchall()}
+        deleted = [name for name in names if name not in kept]
+        for name in deleted:
+            image_storage.delete(name)
+    return deleted
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage naming files by content hash and counting users
+
+    The upload_to directory and extension of a name are kept, the base
+    name becomes <first two hex digits>/<digest><extension>.
+    """
+
+    def save(self, name, content, max_length=None):
+        """Store content once, take a reference and return its name"""
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = content_digest(content)
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name),
+            digest[:2],
+            f"{digest}{extension}",
+        )
+        with transaction.atomic():
+            # Taken first, so a concurrent collect() keeps the file
+            acquire([name])
+            if not self.exists(name):
+                saved = super().save(name, content, max_length)
+                if saved != name:
+                    # Written concurrently under the hashed name, same bytes
+                    self.delete(saved)
+        return name
+
+
+image_storage = ContentAddressedStorage()
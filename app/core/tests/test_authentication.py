@@ -0,0 +1,252 @@
+"""
+Tests for the cached token authentication
+"""
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    local_cache,
+    password_fingerprint,
+    token_cache_key,
+)
+
+ME_URL = reverse("user:me")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+@contextmanager
+def in_another_worker(shared=True):
+    """Run a block with the caches another process would have
+
+    The worker cache is always its own, the default cache too unless it
+    is shared.
+    """
+    default = cache if shared else LocMemCache("other-default", {})
+    with mock.patch(
+        "core.authentication.local_cache",
+        LocMemCache("other-worker", {}),
+    ), mock.patch("core.authentication.cache", default):
+        yield
+
+
+def after_local_timeout():
+    """Make worker cache entries look expired"""
+    later = time.time() + settings.AUTH_TOKEN_LOCAL_TIMEOUT + 1
+    return mock.patch(
+        "django.core.cache.backends.locmem.time",
+        SimpleNamespace(time=lambda: later),
+    )
+
+
+# The default cache stands in for a shared backend here
+@override_settings(CACHE_SHARED=True)
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached and invalidated."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+            name="Test Name",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")
+
+    def test_cached_request_skips_auth_query(self):
+        """Test repeat requests authenticate without a query"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_shared_cache_fills_local_cache(self):
+        """Test a worker without a local copy loads the user by id"""
+        self.client.get(ME_URL)
+        local_cache.clear()
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn("authtoken_token", ctx.captured_queries[0]["sql"])
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+    def test_token_not_stored_in_cache(self):
+        """Test the cache key does not contain the token"""
+        self.client.get(ME_URL)
+        key = token_cache_key(self.token.key)
+
+        self.assertNotIn(self.token.key, key)
+        self.assertEqual(cache.get(key)[0], self.user.pk)
+
+    def test_password_hash_not_shared(self):
+        """Test the shared cache holds no user or password hash"""
+        self.client.get(ME_URL)
+
+        entry = cache.get(token_cache_key(self.token.key))
+
+        self.assertEqual(
+            entry, (self.user.pk, True, password_fingerprint(self.user)),
+        )
+        self.assertNotIn(self.user.password, entry)
+
+    def test_stale_shared_entry_ignored(self):
+        """Test a shared entry of an older password is looked up again"""
+        self.client.get(ME_URL)
+        cache_key = token_cache_key(self.token.key)
+        local_cache.clear()
+        # update() sends no signals, the shared entry keeps the old password
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password="changed",
+        )
+
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(cache.get(cache_key)[2], password_fingerprint(
+            get_user_model().objects.get(pk=self.user.pk),
+        ))
+
+    @override_settings(AUTH_TOKEN_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        """Test every request queries the token with the cache off"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token drops its cached user"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_rejected(self):
+        """Test deleting a user drops the cached user of its token"""
+        self.client.get(ME_URL)
+        self.user.delete()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user drops the cached user"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_refreshes_user(self):
+        """Test a new password is not hidden by the cached user"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"password": "newpass123"})
+
+        cached = cache.get(token_cache_key(self.token.key))
+        self.assertIsNone(cached)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            local_cache.get(token_cache_key(self.token.key)).check_password(
+                "newpass123",
+            )
+        )
+
+    def test_profile_update_visible(self):
+        """Test profile changes show on the next request"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"name": "New Name"})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "New Name")
+
+    def test_revoked_elsewhere_rejected_after_local_timeout(self):
+        """Test a token deleted by another worker expires from this one"""
+        self.client.get(ME_URL)
+        key = self.token.key
+
+        with in_another_worker():
+            self.token.delete()
+
+        self.assertIsNone(cache.get(token_cache_key(key)))
+        with after_local_timeout():
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_update_saves_fresh_user(self):
+        """Test a profile update does not write back a stale cached user"""
+        self.client.get(ME_URL)
+        # update() sends no signals, the cached user keeps is_active
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False,
+        )
+
+        self.client.patch(ME_URL, {"name": "New Name"})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, "New Name")
+        self.assertFalse(self.user.is_active)
+
+
+@override_settings(CACHE_SHARED=False)
+class LocalTokenCacheTests(TestCase):
+    """Test token lookups with a cache that is not shared between workers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")
+
+    def test_shared_cache_not_used(self):
+        """Test users are only cached per worker, for the local timeout"""
+        self.client.get(ME_URL)
+
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+        with after_local_timeout(), self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    def test_revoked_elsewhere_rejected_after_local_timeout(self):
+        """Test a token deleted by another worker expires from this one"""
+        self.client.get(ME_URL)
+
+        with in_another_worker(shared=False):
+            self.token.delete()
+
+        with after_local_timeout():
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -3,13 +3,21 @@ Test custom commands to check db status
 
 """
 
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from django.contrib.auth import get_user_model
+
+from core.models import Recipe
 
 @patch("core.management.commands.wait_for_db.Command.check")
 class CommandTests(SimpleTestCase):
@@ -32,3 +40,145 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test the recipe list benchmark command."""
+
+    def test_benchmark_recipe_list(self):
+        """Test the benchmark reports each size and leaves no rows behind"""
+        out = StringIO()
+
+        call_command(
+            "benchmark_recipe_list", rows=[2, 5], repeat=1, stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("speedup", lines[1])
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchmarkAuthTests(TestCase):
+    """Test the login and signup benchmark command."""
+
+    def test_benchmark_auth(self):
+        """Test login and signup are timed per hashing cost"""
+        out = StringIO()
+
+        call_command(
+            "benchmark_auth",
+            profiles=[],
+            iterations=[1000],
+            requests=1,
+            workers=4,
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "custom (1000 iterations)")
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:]],
+            ["hash", "login", "signup"],
+        )
+        self.assertIn("on 4 workers", lines[2])
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_auth_unknown_profile(self):
+        """Test unknown hashing profiles are rejected"""
+        with self.assertRaises(CommandError):
+            call_command("benchmark_auth", profiles=["fastest"])
+
+
+class SeedBenchmarkDataTests(TestCase):
+    """Test the benchmark data generator."""
+
+    def _seed(self, **options):
+        """Seed a small data set and return its contents"""
+        call_command(
+            "seed_benchmark_data",
+            users=5,
+            recipes=20,
+            chunk_size=50,
+            stdout=StringIO(),
+            **options,
+        )
+        recipes = Recipe.objects.order_by("id")
+        return [
+            (
+                recipe.user.email,
+                recipe.title,
+                recipe.price,
+                recipe.created_at,
+                sorted(tag.name for tag in recipe.tags.all()),
+                sorted(item.name for item in recipe.ingredients.all()),
+            )
+            for recipe in recipes.prefetch_related("tags", "ingredients")
+        ]
+
+    def test_seed_is_deterministic(self):
+        """Test the same seed generates the same data"""
+        first = self._seed(seed=7)
+        get_user_model().objects.all().delete()
+
+        second = self._seed(seed=7, no_copy=True)
+
+        self.assertEqual(first, second)
+        self.assertTrue(any(row[4] for row in first))
+        self.assertTrue(any(row[5] for row in first))
+
+    def test_seed_search_vectors(self):
+        """Test skipping triggers still leaves recipes searchable"""
+        self._seed(seed=1, skip_triggers=True)
+
+        self.assertGreater(Recipe.objects.count(), 0)
+        self.assertFalse(
+            Recipe.objects.filter(search_vector__isnull=True).exists()
+        )
+
+
+class BenchmarkEndpointsTests(TestCase):
+    """Test the endpoint benchmark suite."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.baseline = os.path.join(self.tmp.name, "endpoints.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _run(self, **options):
+        call_command(
+            "benchmark_endpoints",
+            sizes=[3],
+            iterations=1,
+            baseline=self.baseline,
+            stdout=StringIO(),
+            stderr=StringIO(),
+            **options,
+        )
+
+    def test_baseline_written(self):
+        """Test every scenario is recorded in the baseline"""
+        self._run(update_baseline=True)
+
+        with open(self.baseline) as handle:
+            results = json.load(handle)["results"]
+        self.assertIn("recipe-upload-image", results)
+        self.assertEqual(
+            set(results["recipe-list"]["3"]),
+            {"p50_ms", "p95_ms", "queries", "bytes", "peak_kb"},
+        )
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_regression_flagged(self):
+        """Test a metric above the baseline threshold fails the run"""
+        self._run(only=["health", "recipe-list"], update_baseline=True)
+        with open(self.baseline) as handle:
+            report = json.load(handle)
+        report["results"]["recipe-list"]["3"]["queries"] = 1
+        with open(self.baseline, "w") as handle:
+            json.dump(report, handle)
+
+        with self.assertRaisesMessage(CommandError, "1 metrics regressed"):
+            self._run(only=["recipe-list"], threshold=1000)
@@ -0,0 +1,57 @@
+"""
+Tests for the settings driven password hasher
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+TOKEN_URL = reverse("user:token")
+
+
+def iterations(user):
+    """Return the PBKDF2 iterations of a user's stored password"""
+    user.refresh_from_db()
+    algorithm, count, _ = user.password.split("$", 2)
+    assert algorithm == "pbkdf2_sha256"
+    return int(count)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class ProfiledHasherTests(TestCase):
+    """Test password hashing follows PASSWORD_HASH_ITERATIONS."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+
+    def test_new_password_uses_setting(self):
+        """Test passwords are hashed with the configured iterations"""
+        self.assertEqual(iterations(self.user), 1000)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=2000)
+    def test_login_rehashes_after_profile_change(self):
+        """Test logging in updates a hash made with the old cost"""
+        res = self.client.post(TOKEN_URL, {
+            "email": "user@example.com",
+            "password": "testpass123",
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(iterations(self.user), 2000)
+        self.assertTrue(self.user.check_password("testpass123"))
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=2000)
+    def test_failed_login_keeps_hash(self):
+        """Test a wrong password does not rehash"""
+        res = self.client.post(TOKEN_URL, {
+            "email": "user@example.com",
+            "password": "wrongpass",
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(iterations(self.user), 1000)
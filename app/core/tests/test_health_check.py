@@ -1,13 +1,19 @@
 """
 Test for health check
 """
+import os
+import tempfile
+from unittest.mock import Mock, patch
 
-from django.test import TestCase
+from django.db import OperationalError
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core import health
+
 class HealthCheckTests(TestCase):
     """Health Check Tests."""
     def test_health_check(self):
@@ -17,3 +23,78 @@ class HealthCheckTests(TestCase):
         response = client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProbeTests(TestCase):
+    """Test the liveness and readiness probes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        settings = override_settings(
+            MEDIA_ROOT=self.media,
+            HEALTH_PROBE_CACHE_SECONDS=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        health.reset()
+        self.addCleanup(health.reset)
+
+    def test_liveness(self):
+        """Test liveness answers without touching the database"""
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse("liveness"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {"healthy": True})
+        self.assertNotIn("sessionid", res.cookies)
+
+    def test_readiness(self):
+        """Test readiness reports each dependency"""
+        res = self.client.get(reverse("readiness"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = res.json()
+        self.assertTrue(data["ready"])
+        self.assertEqual(set(data["checks"]), {"database", "media", "cache"})
+        self.assertTrue(all(c["ok"] for c in data["checks"].values()))
+        self.assertEqual(os.listdir(self.media), [])
+
+    def test_readiness_database_down(self):
+        """Test a failing database makes the worker unready"""
+        def fail():
+            raise OperationalError("connection refused")
+
+        with patch.dict(health.PROBES, database=fail), \
+                self.assertLogs("core.health", "WARNING"):
+            res = self.client.get(reverse("readiness"))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        checks = res.json()["checks"]
+        self.assertEqual(checks["database"]["error"], "OperationalError")
+        self.assertTrue(checks["cache"]["ok"])
+
+    def test_readiness_media_not_writable(self):
+        """Test a missing or read-only media volume makes the worker unready"""
+        missing = os.path.join(self.media, "missing")
+
+        with self.settings(MEDIA_ROOT=missing), \
+                self.assertLogs("core.health", "WARNING"):
+            res = self.client.get(reverse("readiness"))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(res.json()["checks"]["media"]["ok"])
+
+    def test_readiness_results_cached(self):
+        """Test repeated probes reuse the last results"""
+        probe = Mock()
+
+        with self.settings(HEALTH_PROBE_CACHE_SECONDS=60), \
+                patch.dict(health.PROBES, {"database": probe}):
+            for _ in range(3):
+                res = self.client.get(reverse("readiness"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        probe.assert_called_once()
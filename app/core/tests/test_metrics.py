@@ -0,0 +1,138 @@
+"""
+Tests for the Prometheus metrics endpoint
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework.test import APIClient
+
+METRICS_URL = reverse("metrics")
+TAGS_URL = reverse("recipe:tag-list")
+METRICS_TOKEN = "scrape-token"
+
+WORKER_SCRIPT = """
+from core import metrics
+metrics.REQUESTS.labels("recipe:tag-list", "GET", 200).inc(2)
+metrics.IN_FLIGHT.inc()
+"""
+
+
+def samples(content):
+    """Return {(name, labels): value} from a metrics response body"""
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(content.decode())
+        for sample in family.samples
+    }
+
+
+@override_settings(METRICS_TOKEN=METRICS_TOKEN)
+class MetricsTests(TestCase):
+    """Test the metrics endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+
+    def _scrape(self):
+        """Request the metrics with the scrape token"""
+        return self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION=f"Bearer {METRICS_TOKEN}",
+        )
+
+    def _count(self, values, name, **labels):
+        return values.get((name, tuple(sorted(labels.items()))), 0)
+
+    def test_requires_token(self):
+        """Test scrapes without the token are refused"""
+        self.client.force_authenticate(None)
+
+        for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer wrong"}):
+            res = self.client.get(METRICS_URL, **headers)
+
+            self.assertEqual(res.status_code, 403)
+        self.assertEqual(self._scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_closed_without_token(self):
+        """Test the endpoint refuses every request when no token is set"""
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer ")
+
+        self.assertEqual(res.status_code, 403)
+
+    def test_request_metrics(self):
+        """Test requests are counted and timed by route and method"""
+        before = samples(self._scrape().content)
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        res = self._scrape()
+
+        after = samples(res.content)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        route = {"route": "recipe:tag-list", "method": "GET"}
+        for name, labels, increase in (
+            ("django_http_requests_total", {**route, "status": "200"}, 2),
+            ("django_http_request_duration_seconds_count", route, 2),
+            ("django_http_request_db_queries_count", route, 2),
+        ):
+            self.assertEqual(
+                self._count(after, name, **labels)
+                - self._count(before, name, **labels),
+                increase,
+            )
+        self.assertGreater(
+            self._count(after, "django_http_request_db_queries_sum", **route),
+            self._count(before, "django_http_request_db_queries_sum", **route),
+        )
+        # The metrics request itself is in flight
+        self.assertEqual(
+            self._count(after, "django_http_requests_in_flight"), 1,
+        )
+
+    def test_unresolved_route(self):
+        """Test unknown paths share one route label"""
+        self.client.get("/api/does-not-exist/")
+
+        values = samples(self._scrape().content)
+
+        self.assertGreater(self._count(
+            values, "django_http_requests_total",
+            route="unresolved", method="GET", status="404",
+        ), 0)
+
+    def test_multiprocess_aggregation(self):
+        """Test values written by separate workers are added up"""
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+            for _ in range(3):
+                subprocess.run(
+                    [sys.executable, "-c", WORKER_SCRIPT],
+                    env=env,
+                    cwd=settings.BASE_DIR,
+                    check=True,
+                )
+            with patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory):
+                values = samples(self._scrape().content)
+
+        self.assertEqual(self._count(
+            values, "django_http_requests_total",
+            route="recipe:tag-list", method="GET", status="200",
+        ), 6)
+        # Workers that exited no longer count as in flight
+        self.assertEqual(
+            self._count(values, "django_http_requests_in_flight"), 0,
+        )
@@ -0,0 +1,70 @@
+"""
+Tests for the Server-Timing middleware
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Tag
+
+TAGS_URL = reverse("recipe:tag-list")
+HEALTH_URL = reverse("health-check")
+
+
+def parse_server_timing(value):
+    """Return {name: (duration, description)} from a header value"""
+    metrics = {}
+    for metric in value.split(", "):
+        name, *params = metric.split(";")
+        params = dict(param.split("=", 1) for param in params)
+        metrics[name] = (float(params["dur"]), params.get("desc"))
+    return metrics
+
+
+@override_settings(SERVER_TIMING_HEADER=True)
+class ServerTimingTests(TestCase):
+    """Test request timing headers and logs."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+        Tag.objects.create(user=self.user, name="Vegan")
+
+    def test_server_timing_header(self):
+        """Test API responses report db, view, render and total time"""
+        res = self.client.get(TAGS_URL)
+
+        metrics = parse_server_timing(res["Server-Timing"])
+        self.assertEqual(
+            set(metrics), {"db", "view", "render", "total"},
+        )
+        self.assertNotEqual(metrics["db"][1], '"0 queries"')
+        self.assertGreaterEqual(
+            metrics["total"][0],
+            metrics["view"][0] + metrics["render"][0] - 0.1,
+        )
+
+    def test_health_check_without_queries(self):
+        """Test a view running no SQL reports zero queries"""
+        res = self.client.get(HEALTH_URL)
+
+        metrics = parse_server_timing(res["Server-Timing"])
+        self.assertEqual(metrics["db"], (0.0, '"0 queries"'))
+
+    @override_settings(SERVER_TIMING_HEADER=False, SERVER_TIMING_LOG=True)
+    def test_structured_log(self):
+        """Test timings are logged with structured fields"""
+        with self.assertLogs("core.timing", "INFO") as logs:
+            res = self.client.get(TAGS_URL)
+
+        self.assertNotIn("Server-Timing", res)
+        record = logs.records[0]
+        self.assertEqual(record.timing["path"], TAGS_URL)
+        self.assertEqual(record.timing["status"], 200)
+        self.assertGreater(record.timing["db_queries"], 0)
+        self.assertIn("db_queries=", record.getMessage())
@@ -1,7 +1,6 @@
 """
 Test for models
 """
-from unittest.mock import patch
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from decimal import Decimal
@@ -86,10 +85,24 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(ingredient), ingredient.name)
 
-    @patch('core.models.uuid.uuid4')
-    def test_recipe_file_name_uuid(self, mock_uuid):
-        """Test the file name for image is uuid"""
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
+    def test_recipe_timestamps(self):
+        """Test recipes track creation and link changes in timestamps"""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title="Sample Recipe Title",
+            time_minutes=5,
+            price=Decimal("5.5"),
+        )
+        self.assertIsNotNone(recipe.created_at)
+        created = recipe.updated_at
+
+        recipe.tags.add(models.Tag.objects.create(user=user, name="tag1"))
+        recipe.refresh_from_db()
+
+        self.assertGreater(recipe.updated_at, created)
+
+    def test_recipe_file_name_keeps_extension(self):
+        """Test the image path keeps the extension for the storage"""
         file_path = models.recipe_image_file_path(None,'example.jpg')
-        self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+        self.assertEqual(file_path, 'uploads/recipe/image.jpg')
@@ -0,0 +1,101 @@
+"""
+Tests for the request profiling middleware
+"""
+import os
+import pstats
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+TAGS_URL = reverse("recipe:tag-list")
+HEALTH_URL = reverse("health-check")
+
+
+class ProfilingTests(TestCase):
+    """Test profiles are only written when asked for by staff or sampled."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.staff = get_user_model().objects.create_user(
+            "staff@example.com",
+            "testpass123",
+            is_staff=True,
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        settings = override_settings(
+            PROFILE_ROOT=self.root,
+            PROFILE_SAMPLE_RATE=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _authenticate(self, user):
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+
+    def test_staff_header_writes_profile(self):
+        """Test a staff request with X-Profile is profiled"""
+        self._authenticate(self.staff)
+
+        with self.assertLogs("core.profiling") as logs:
+            res = self.client.get(TAGS_URL, HTTP_X_PROFILE="1")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(res["X-Profile"], logs.output[0])
+        self.assertEqual(os.listdir(self.root), [res["X-Profile"]])
+        self.assertIn("recipe-tag-list", res["X-Profile"])
+        stats = pstats.Stats(os.path.join(self.root, res["X-Profile"]))
+        self.assertTrue(any(
+            function == "list" for _, _, function in stats.stats
+        ))
+
+    def test_staff_query_flag_writes_profile(self):
+        """Test a staff request with ?profile=1 is profiled"""
+        self._authenticate(self.staff)
+
+        with self.assertLogs("core.profiling"):
+            res = self.client.get(TAGS_URL, {"profile": "1"})
+
+        self.assertIn("X-Profile", res)
+        self.assertEqual(len(os.listdir(self.root)), 1)
+
+    def test_non_staff_not_profiled(self):
+        """Test the flag is ignored for regular and anonymous users"""
+        self._authenticate(self.user)
+        res = self.client.get(TAGS_URL, HTTP_X_PROFILE="1")
+        self.client.credentials()
+        anonymous = self.client.get(HEALTH_URL, {"profile": "1"})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("X-Profile", res)
+        self.assertNotIn("X-Profile", anonymous)
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_flag_off_not_profiled(self):
+        """Test staff requests without the flag are not profiled"""
+        self._authenticate(self.staff)
+
+        res = self.client.get(TAGS_URL, HTTP_X_PROFILE="0")
+
+        self.assertNotIn("X-Profile", res)
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_sampled_requests_profiled(self):
+        """Test PROFILE_SAMPLE_RATE profiles any request"""
+        with self.settings(PROFILE_SAMPLE_RATE=1.0), \
+                self.assertLogs("core.profiling"):
+            res = self.client.get(HEALTH_URL)
+
+        # Sampled profiles are stored without telling the client
+        self.assertNotIn("X-Profile", res)
+        self.assertEqual(len(os.listdir(self.root)), 1)
@@ -0,0 +1,88 @@
+"""
+Tests for the fast JSON renderer and parser
+"""
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import BytesIO
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import (
+    FastJSONParser,
+    FastJSONRenderer,
+)
+
+
+class FastJSONTests(SimpleTestCase):
+    """Test FastJSONRenderer and FastJSONParser."""
+
+    data = {
+        "id": 1,
+        "title": "Crème brûlée\u2028\u2029",
+        "price": Decimal("5.50"),
+        "created_at": datetime(2022, 5, 1, 12, 30, 1, 123456, timezone.utc),
+        "uuid": uuid.UUID(int=1),
+        "tags": [{"id": 2, "name": "Dessert"}],
+        "link": None,
+    }
+
+    def test_render_matches_json_renderer(self):
+        """Test the rendered bytes equal the stdlib renderer's"""
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data),
+        )
+
+    def test_render_int_keys(self):
+        """Test int keyed dicts, as in ListField errors, render as strings"""
+        data = {"ids": {0: ["A valid integer is required."]}}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            JSONRenderer().render(data),
+        )
+
+    def test_render_big_int_falls_back(self):
+        """Test values orjson cannot encode are left to the stdlib"""
+        data = {"id": 2 ** 70}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            JSONRenderer().render(data),
+        )
+
+    def test_render_indent_falls_back(self):
+        """Test indented output is left to the stdlib renderer"""
+        context = {"indent": 2}
+
+        content = FastJSONRenderer().render(self.data, None, context)
+
+        self.assertEqual(
+            content,
+            JSONRenderer().render(self.data, None, context),
+        )
+        self.assertIn(b"\n  ", content)
+
+    @override_settings(API_FAST_JSON=False)
+    def test_render_stdlib_fallback(self):
+        """Test the stdlib renderer is used when fast JSON is off"""
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data),
+        )
+
+    def test_parse(self):
+        """Test JSON bodies are parsed"""
+        parsed = FastJSONParser().parse(BytesIO(b'{"a": [1, 2.5, "\\u00e9"]}'))
+
+        self.assertEqual(parsed, {"a": [1, 2.5, "é"]})
+
+    def test_parse_error(self):
+        """Test invalid JSON raises a ParseError"""
+        for fast in (True, False):
+            with override_settings(API_FAST_JSON=fast):
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(BytesIO(b'{"a": NaN}'))
@@ -0,0 +1,256 @@
+"""
+Tests for the content addressed recipe image storage
+"""
+import hashlib
+import os
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core.models import Recipe, StoredImage
+from core.storage import image_storage, is_hashed
+
+
+def jpeg_bytes(color=(200, 120, 40)):
+    """Return a small JPEG image"""
+    buffer = BytesIO()
+    Image.new("RGB", (20, 10), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def ref_count(name):
+    """Return the stored reference count of a name, None without a row"""
+    return StoredImage.objects.filter(name=name).values_list(
+        "ref_count", flat=True,
+    ).first()
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test images are deduplicated and collected when unused."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        settings = override_settings(
+            MEDIA_ROOT=self.media,
+            IMAGE_VARIANT_WIDTHS=[8],
+            IMAGE_VARIANT_FORMATS=["jpeg"],
+            IMAGE_VARIANTS_ASYNC=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+        self.recipes = [self._recipe(f"Recipe {i}") for i in range(2)]
+
+    def _recipe(self, title):
+        return Recipe.objects.create(
+            user=self.user,
+            title=title,
+            time_minutes=10,
+            price=Decimal("2.50"),
+        )
+
+    def _upload(self, recipe, content):
+        """Upload an image, keeping the original, and run commit hooks"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("recipe:recipe-upload-image", args=[recipe.id]),
+                {
+                    "image": SimpleUploadedFile(
+                        "photo.JPG", content, content_type="image/jpeg",
+                    ),
+                    "keep_original": True,
+                },
+                format="multipart",
+            )
+        recipe.refresh_from_db()
+        return recipe.image.name
+
+    def test_image_named_by_content_hash(self):
+        """Test the stored name is the SHA-256 of the upload"""
+        content = jpeg_bytes()
+
+        name = self._upload(self.recipes[0], content)
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(name, f"uploads/recipe/{digest[:2]}/{digest}.jpg")
+        self.assertTrue(is_hashed(name))
+        with image_storage.open(name) as handle:
+            self.assertEqual(handle.read(), content)
+
+    def test_duplicate_uploads_share_file(self):
+        """Test identical uploads are stored once and counted twice"""
+        content = jpeg_bytes()
+
+        first = self._upload(self.recipes[0], content)
+        second = self._upload(self.recipes[1], content)
+
+        self.assertEqual(first, second)
+        self.assertEqual(ref_count(first), 2)
+        self.assertEqual(
+            os.listdir(os.path.dirname(image_storage.path(first))),
+            [os.path.basename(first)],
+        )
+
+    def test_replace_keeps_shared_file(self):
+        """Test replacing frees the old file only after its last user"""
+        shared = self._upload(self.recipes[0], jpeg_bytes())
+        self._upload(self.recipes[1], jpeg_bytes())
+
+        self._upload(self.recipes[0], jpeg_bytes((0, 0, 255)))
+
+        self.assertTrue(image_storage.exists(shared))
+        self.assertEqual(ref_count(shared), 1)
+
+        self._upload(self.recipes[1], jpeg_bytes((0, 255, 0)))
+
+        self.assertFalse(image_storage.exists(shared))
+        self.assertIsNone(ref_count(shared))
+
+    def test_delete_collects_image_and_variants(self):
+        """Test deleting the last recipe using files removes them"""
+        name = self._upload(self.recipes[0], jpeg_bytes())
+        variant = self.recipes[0].image_variants["8"]["jpeg"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(
+                reverse("recipe:recipe-detail", args=[self.recipes[0].id]),
+            )
+
+        self.assertFalse(image_storage.exists(name))
+        self.assertFalse(image_storage.exists(variant))
+        self.assertFalse(StoredImage.objects.exists())
+
+    def test_bulk_delete_collects_shared_image(self):
+        """Test a bulk delete releases every reference of a batch at once"""
+        name = self._upload(self.recipes[0], jpeg_bytes())
+        self._upload(self.recipes[1], jpeg_bytes())
+        self.assertEqual(ref_count(name), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("recipe:recipe-bulk-delete"),
+                {"ids": [recipe.id for recipe in self.recipes]},
+                format="json",
+            )
+
+        self.assertFalse(image_storage.exists(name))
+        self.assertFalse(StoredImage.objects.exists())
+
+    def test_bulk_delete_shared_image(self):
+        """Test a bulk delete of every user removes the shared file"""
+        for recipe in self.recipes:
+            name = self._upload(recipe, jpeg_bytes())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("recipe:recipe-bulk-delete"),
+                {"ids": [recipe.id for recipe in self.recipes]},
+                format="json",
+            )
+
+        self.assertFalse(image_storage.exists(name))
+
+
+class ReclaimImageStorageTests(TestCase):
+    """Test the command reclaiming space on existing volumes."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        # Files saved by the old uuid naming, two with the same content
+        legacy = FileSystemStorage()
+        self.legacy = [
+            legacy.save(f"uploads/recipe/legacy-{i}.jpg", ContentFile(data))
+            for i, data in enumerate((jpeg_bytes(), jpeg_bytes(), b"x"))
+        ]
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user,
+                title=f"Recipe {i}",
+                time_minutes=10,
+                price=Decimal("2.50"),
+                image=name,
+            )
+            for i, name in enumerate(self.legacy[:2])
+        ]
+        self.orphan = self.legacy[2]
+        old = time.time() - 7200
+        for name in self.legacy:
+            os.utime(legacy.path(name), (old, old))
+
+    def _reclaim(self, **options):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("reclaim_image_storage", stdout=out, **options)
+        return out.getvalue()
+
+    def test_reclaim(self):
+        """Test legacy duplicates are merged and orphans deleted"""
+        output = self._reclaim()
+
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+        name = self.recipes[0].image.name
+        self.assertTrue(is_hashed(name))
+        self.assertEqual(self.recipes[1].image.name, name)
+        self.assertEqual(ref_count(name), 2)
+        self.assertFalse(any(
+            image_storage.exists(legacy) for legacy in self.legacy
+        ))
+        self.assertIn("2 legacy images moved", output)
+        self.assertIn("Deleted 3 orphaned files", output)
+
+    def test_dry_run(self):
+        """Test a dry run reports without changing anything"""
+        output = self._reclaim(dry_run=True)
+
+        self.assertTrue(all(
+            image_storage.exists(legacy) for legacy in self.legacy
+        ))
+        self.recipes[0].refresh_from_db()
+        self.assertEqual(self.recipes[0].image.name, self.legacy[0])
+        self.assertIn("Would delete 1 orphaned files", output)
+
+    def test_recent_orphans_kept(self):
+        """Test files newer than --min-age are not deleted"""
+        os.utime(image_storage.path(self.orphan))
+
+        self._reclaim()
+
+        self.assertTrue(image_storage.exists(self.orphan))
+
+    def test_counts_repaired(self):
+        """Test wrong reference counts are set from the recipes"""
+        self._reclaim()
+        name = Recipe.objects.first().image.name
+        StoredImage.objects.filter(name=name).update(ref_count=9)
+
+        output = self._reclaim()
+
+        self.assertEqual(ref_count(name), 2)
+        self.assertIn("1 reference counts fixed", output)
@@ -0,0 +1,168 @@
+"""
+Tests for the export_recipes and import_recipes commands
+"""
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+    StoredImage,
+)
+
+
+class TransferCommandTests(TestCase):
+    """Test exporting and importing a user's recipes."""
+
+    def setUp(self):
+        self.source = get_user_model().objects.create_user(
+            "source@example.com",
+            "testpass123",
+        )
+        self.target = get_user_model().objects.create_user(
+            "target@example.com",
+            "testpass123",
+        )
+        tags = [
+            Tag.objects.create(user=self.source, name=name)
+            for name in ("Vegan", "Quick, easy")
+        ]
+        ingredient = Ingredient.objects.create(user=self.source, name="Kale")
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.source,
+                title=f'Recipe "{i}"',
+                description="" if i else "Line one\nline two",
+                time_minutes=i,
+                price=Decimal("4.50"),
+            )
+            recipe.tags.add(*tags[:i % 3])
+            if i % 2:
+                recipe.ingredients.add(ingredient)
+        # Existing names are reused instead of duplicated
+        Tag.objects.create(user=self.target, name="Vegan")
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _snapshot(self, user):
+        """Return the user's recipes with their links, by title"""
+        return sorted(
+            (
+                recipe.title,
+                recipe.description,
+                recipe.time_minutes,
+                recipe.price,
+                recipe.link,
+                bool(recipe.image),
+                sorted(tag.name for tag in recipe.tags.all()),
+                sorted(item.name for item in recipe.ingredients.all()),
+            )
+            for recipe in Recipe.objects.filter(user=user)
+        )
+
+    def _assert_copied(self):
+        self.assertEqual(
+            self._snapshot(self.target),
+            self._snapshot(self.source),
+        )
+        self.assertEqual(Tag.objects.filter(user=self.target).count(), 2)
+
+    def test_ndjson_round_trip(self):
+        """Test NDJSON exports import into another account"""
+        path = os.path.join(self.tmp.name, "export.ndjson")
+        err = StringIO()
+
+        call_command(
+            "export_recipes", "source@example.com", output=path, stderr=err,
+        )
+        call_command(
+            "import_recipes", "target@example.com", path,
+            stdout=StringIO(), stderr=err,
+        )
+
+        with open(path) as handle:
+            types = [json.loads(line)["type"] for line in handle]
+        self.assertEqual(types, ["tag"] * 2 + ["ingredient"] + ["recipe"] * 5)
+        self.assertIn("recipe: 5 rows", err.getvalue())
+        self._assert_copied()
+
+    def test_csv_round_trip_copy(self):
+        """Test CSV exports written and loaded with COPY"""
+        call_command(
+            "export_recipes", "source@example.com",
+            format="csv", output=self.tmp.name, stderr=StringIO(),
+        )
+        call_command(
+            "import_recipes", "target@example.com", self.tmp.name,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        self._assert_copied()
+
+    def test_csv_copy_counts_shared_images(self):
+        """Test COPY imports add one reference per recipe using an image"""
+        name = "uploads/recipe/shared.jpg"
+        Recipe.objects.filter(user=self.source, time_minutes__lt=2).update(
+            image=name,
+        )
+        StoredImage.objects.create(name=name, ref_count=2)
+        call_command(
+            "export_recipes", "source@example.com",
+            format="csv", output=self.tmp.name, stderr=StringIO(),
+        )
+
+        call_command(
+            "import_recipes", "target@example.com", self.tmp.name,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        self.assertEqual(StoredImage.objects.get(name=name).ref_count, 4)
+        self.assertEqual(StoredImage.objects.count(), 1)
+
+    def test_csv_round_trip_without_copy(self):
+        """Test the row by row CSV writer and chunked loader"""
+        call_command(
+            "export_recipes", "source@example.com",
+            format="csv", output=self.tmp.name, no_copy=True,
+            stderr=StringIO(),
+        )
+        call_command(
+            "import_recipes", "target@example.com", self.tmp.name,
+            no_copy=True, chunk_size=2,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+        self._assert_copied()
+
+    def test_csv_writers_match(self):
+        """Test COPY and the fallback writer produce the same files"""
+        copy_dir = os.path.join(self.tmp.name, "copy")
+        rows_dir = os.path.join(self.tmp.name, "rows")
+        for output, no_copy in ((copy_dir, False), (rows_dir, True)):
+            call_command(
+                "export_recipes", "source@example.com", format="csv",
+                output=output, no_copy=no_copy, stderr=StringIO(),
+            )
+
+        for name in ("tags.csv", "ingredients.csv", "recipes.csv"):
+            with open(os.path.join(copy_dir, name)) as copied, \
+                    open(os.path.join(rows_dir, name)) as written:
+                self.assertEqual(
+                    copied.read().replace('"', ""),
+                    written.read().replace('"', ""),
+                )
+
+    def test_unknown_user(self):
+        """Test exporting a missing user fails"""
+        with self.assertRaises(CommandError):
+            call_command("export_recipes", "missing@example.com")
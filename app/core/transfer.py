@@ -0,0 +1,366 @@
+"""
+Streaming export and import of a user's recipes, tags and ingredients
+
+Exports hold tags, then ingredients, then recipes carrying the ids of
+their linked tags and ingredients. As NDJSON every line is one record
+with a "type" key, as CSV every entity is a file in a directory.
+"""
+import csv
+import json
+import os
+import time
+from itertools import groupby
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import OuterRef
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+    StoredImage,
+)
+from core.storage import acquire
+from core.utils import chunked
+
+ATTR_COLUMNS = ("id", "name")
+RECIPE_COLUMNS = (
+    "id",
+    "title",
+    "description",
+    "time_minutes",
+    "price",
+    "link",
+    "image",
+)
+# Exported link id column -> (recipe m2m field, linked entity)
+LINK_COLUMNS = {
+    "tag_ids": ("tags", "tag"),
+    "ingredient_ids": ("ingredients", "ingredient"),
+}
+ATTR_MODELS = {
+    "tag": Tag,
+    "ingredient": Ingredient,
+}
+# Entities in the order they are exported and must be imported
+CSV_FILES = {
+    "tag": "tags.csv",
+    "ingredient": "ingredients.csv",
+    "recipe": "recipes.csv",
+}
+
+
+def copy_available():
+    """Return True when the database connection supports COPY"""
+    return connection.vendor == "postgresql"
+
+
+class Progress:
+    """Report rows transferred and throughput for one entity"""
+
+    def __init__(self, write, label, every=10000):
+        self.write = write
+        self.label = label
+        self.every = every
+        self.count = 0
+        self.start = time.perf_counter()
+        self._next = every
+
+    def add(self, count):
+        """Count transferred rows, reporting every `every` rows"""
+        self.count += count
+        if self.count >= self._next:
+            self.write(self.line())
+            self._next = (self.count // self.every + 1) * self.every
+
+    def done(self):
+        """Report the final count"""
+        self.write(self.line())
+
+    def line(self):
+        """Return the count, elapsed time and rate as text"""
+        elapsed = time.perf_counter() - self.start
+        rate = self.count / elapsed if elapsed else 0
+        return (
+            f"{self.label}: {self.count} rows in {elapsed:.1f}s "
+            f"({rate:,.0f} rows/s)"
+        )
+
+
+def _linked_ids(field_name):
+    """Return the ids linked to the outer recipe through field_name"""
+    field = Recipe._meta.get_field(field_name)
+    column = field.m2m_reverse_name()
+    return ArraySubquery(
+        field.remote_field.through.objects.filter(
+            **{field.m2m_field_name(): OuterRef("pk")}
+        ).order_by(column).values(column)
+    )
+
+
+def export_querysets(user):
+    """Return (entity, columns, values_list queryset) for the export"""
+    querysets = [
+        (
+            entity,
+            ATTR_COLUMNS,
+            model.objects.filter(user=user).order_by("id").values_list(
+                *ATTR_COLUMNS,
+            ),
+        )
+        for entity, model in ATTR_MODELS.items()
+    ]
+    recipes = Recipe.objects.filter(user=user).annotate(**{
+        column: _linked_ids(field)
+        for column, (field, _) in LINK_COLUMNS.items()
+    }).order_by("id")
+    columns = RECIPE_COLUMNS + tuple(LINK_COLUMNS)
+    querysets.append(("recipe", columns, recipes.values_list(*columns)))
+    return querysets
+
+
+def export_ndjson(user, write, report, chunk_size=2000):
+    """Write the user's rows as NDJSON records through write()"""
+    encoder = DjangoJSONEncoder()
+    for entity, columns, queryset in export_querysets(user):
+        progress = Progress(report, entity)
+        rows = queryset.iterator(chunk_size=chunk_size)
+        for chunk in chunked(rows, chunk_size):
+            write("".join(
+                encoder.encode({"type": entity, **dict(zip(columns, row))})
+                + "\n"
+                for row in chunk
+            ))
+            progress.add(len(chunk))
+        progress.done()
+
+
+def _csv_value(value):
+    """Format a value like COPY ... WITH (FORMAT csv) does"""
+    if isinstance(value, list):
+        return "{" + ",".join(str(item) for item in value) + "}"
+    return value
+
+
+def export_csv(user, directory, report, chunk_size=2000, use_copy=True):
+    """Write the user's rows as one CSV file per entity into directory"""
+    os.makedirs(directory, exist_ok=True)
+    for entity, columns, queryset in export_querysets(user):
+        progress = Progress(report, entity)
+        path = os.path.join(directory, CSV_FILES[entity])
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            if use_copy:
+                sql, params = queryset.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    query = cursor.mogrify(sql, params).decode()
+                    cursor.copy_expert(
+                        f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)",
+                        handle,
+                    )
+                    progress.add(cursor.rowcount)
+            else:
+                # Quoting strings keeps '' apart from NULL, as COPY does
+                writer = csv.writer(handle, quoting=csv.QUOTE_NONNUMERIC)
+                writer.writerow(columns)
+                rows = queryset.iterator(chunk_size=chunk_size)
+                for chunk in chunked(rows, chunk_size):
+                    writer.writerows(
+                        [_csv_value(value) for value in row] for row in chunk
+                    )
+                    progress.add(len(chunk))
+        progress.done()
+
+
+def _parse_ids(value):
+    """Parse a list of ids from JSON or a {1,2} CSV array"""
+    if isinstance(value, list):
+        return value
+    value = (value or "").strip("{}")
+    return [int(item) for item in value.split(",") if item]
+
+
+class Importer:
+    """Load exported rows into a user's account
+
+    Tags and ingredients are matched by name, existing ones are reused.
+    Recipes always get new rows. Only the old to new tag and ingredient
+    ids are kept in memory, recipes are loaded chunk by chunk.
+    """
+
+    def __init__(self, user, report, chunk_size=2000):
+        self.user = user
+        self.report = report
+        self.chunk_size = chunk_size
+        self.id_maps = {entity: {} for entity in ATTR_MODELS}
+
+    def load_ndjson(self, lines):
+        """Load NDJSON records, grouped by their type"""
+        records = (json.loads(line) for line in lines if line.strip())
+        for entity, group in groupby(records, key=lambda r: r["type"]):
+            if entity not in CSV_FILES:
+                raise ValueError(f"Unknown record type: {entity}")
+            self.load(entity, group)
+
+    def load_csv(self, directory):
+        """Load a CSV export directory row by row"""
+        for entity, filename in CSV_FILES.items():
+            path = os.path.join(directory, filename)
+            with open(path, newline="", encoding="utf-8") as handle:
+                self.load(entity, csv.DictReader(handle))
+
+    def load(self, entity, rows):
+        """Load rows of one entity in chunks"""
+        progress = Progress(self.report, entity)
+        for chunk in chunked(rows, self.chunk_size):
+            if entity == "recipe":
+                self._load_recipes(chunk)
+            else:
+                self._load_attrs(entity, chunk)
+            progress.add(len(chunk))
+        progress.done()
+
+    def _load_attrs(self, entity, chunk):
+        """Get or create tags or ingredients by name and map their ids"""
+        model = ATTR_MODELS[entity]
+        names = {row["name"] for row in chunk}
+        model.objects.bulk_create(
+            [model(user=self.user, name=name) for name in names],
+            ignore_conflicts=True,
+        )
+        ids = dict(model.objects.filter(
+            user=self.user,
+            name__in=names,
+        ).values_list("name", "id"))
+        for row in chunk:
+            self.id_maps[entity][int(row["id"])] = ids[row["name"]]
+
+    def _load_recipes(self, chunk):
+        """Create a chunk of recipes and link them"""
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=self.user,
+                **{
+                    column: row[column]
+                    for column in RECIPE_COLUMNS
+                    if column not in ("id", "image")
+                },
+                # CSV has no NULL, an empty image means no image
+                image=row["image"] or None,
+            )
+            for row in chunk
+        ])
+        # Imported rows share the stored image files they name
+        acquire([recipe.image.name for recipe in recipes if recipe.image])
+        for column, (field_name, entity) in LINK_COLUMNS.items():
+            field = Recipe._meta.get_field(field_name)
+            through = field.remote_field.through
+            id_map = self.id_maps[entity]
+            through.objects.bulk_create(
+                [
+                    through(**{
+                        f"{field.m2m_field_name()}_id": recipe.id,
+                        f"{field.m2m_reverse_field_name()}_id": id_map[old],
+                    })
+                    for recipe, row in zip(recipes, chunk)
+                    for old in _parse_ids(row[column])
+                    if old in id_map
+                ],
+                ignore_conflicts=True,
+            )
+
+
+def copy_csv(user, directory, report):
+    """Load a CSV export directory with COPY into temporary tables
+
+    Rows are joined into the real tables in SQL, so Python never holds
+    more than a COPY buffer. Call inside a transaction.
+    """
+    with connection.cursor() as cursor:
+        for entity, model in ATTR_MODELS.items():
+            progress = Progress(report, entity)
+            table = model._meta.db_table
+            cursor.execute(
+                f"CREATE TEMP TABLE import_{entity} ON COMMIT DROP AS "
+                f"SELECT id, name FROM {table} WITH NO DATA"
+            )
+            _copy_from(cursor, f"import_{entity}", ATTR_COLUMNS,
+                       os.path.join(directory, CSV_FILES[entity]))
+            progress.add(cursor.rowcount)
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, name, created_at, updated_at) "
+                f"SELECT DISTINCT %s, name, now(), now() FROM import_{entity} "
+                f"ON CONFLICT DO NOTHING",
+                [user.id],
+            )
+            cursor.execute(
+                f"CREATE TEMP TABLE import_{entity}_map ON COMMIT DROP AS "
+                f"SELECT i.id AS old_id, t.id AS new_id "
+                f"FROM import_{entity} i JOIN {table} t "
+                f"ON t.user_id = %s AND t.name = i.name",
+                [user.id],
+            )
+            progress.done()
+
+        progress = Progress(report, "recipe")
+        table = Recipe._meta.db_table
+        columns = ", ".join(RECIPE_COLUMNS)
+        links = ", ".join(
+            f"NULL::bigint[] AS {column}" for column in LINK_COLUMNS
+        )
+        cursor.execute(
+            f"CREATE TEMP TABLE import_recipe ON COMMIT DROP AS "
+            f"SELECT {columns}, {links}, NULL::bigint AS new_id "
+            f"FROM {table} WITH NO DATA"
+        )
+        _copy_from(cursor, "import_recipe",
+                   RECIPE_COLUMNS + tuple(LINK_COLUMNS),
+                   os.path.join(directory, CSV_FILES["recipe"]))
+        progress.add(cursor.rowcount)
+        # Take new ids up front, in export order, to link by them below
+        cursor.execute(
+            f"UPDATE import_recipe r SET new_id = o.new_id FROM ("
+            f"SELECT id, nextval(pg_get_serial_sequence('{table}', 'id')) "
+            f"AS new_id FROM (SELECT id FROM import_recipe ORDER BY id) s"
+            f") o WHERE r.id = o.id"
+        )
+        values = ", ".join(RECIPE_COLUMNS[1:])
+        cursor.execute(
+            f"INSERT INTO {table} "
+            f"(id, user_id, {values}, created_at, updated_at) "
+            f"SELECT new_id, %s, {values}, now(), now() "
+            f"FROM import_recipe ORDER BY new_id",
+            [user.id],
+        )
+        # Imported rows share the stored image files they name, counted
+        # in SQL so no list of names is built
+        images = StoredImage._meta.db_table
+        cursor.execute(
+            f"INSERT INTO {images} (name, ref_count) "
+            f"SELECT image, count(*) FROM import_recipe "
+            f"WHERE image <> '' GROUP BY image ORDER BY image "
+            f"ON CONFLICT (name) DO UPDATE "
+            f"SET ref_count = {images}.ref_count + EXCLUDED.ref_count"
+        )
+        for column, (field_name, entity) in LINK_COLUMNS.items():
+            field = Recipe._meta.get_field(field_name)
+            cursor.execute(
+                f"INSERT INTO {field.m2m_db_table()} "
+                f"({field.m2m_column_name()}, {field.m2m_reverse_name()}) "
+                f"SELECT r.new_id, m.new_id FROM import_recipe r, "
+                f"unnest(r.{column}) AS l(old_id) "
+                f"JOIN import_{entity}_map m ON m.old_id = l.old_id "
+                f"ON CONFLICT DO NOTHING"
+            )
+        progress.done()
+
+
+def _copy_from(cursor, table, columns, path):
+    """COPY a CSV file with a header row into table"""
+    with open(path, newline="", encoding="utf-8") as handle:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) "
+            f"FROM STDIN WITH (FORMAT csv, HEADER)",
+            handle,
+        )
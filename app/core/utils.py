@@ -0,0 +1,14 @@
+"""
+Small helpers shared by the core and recipe apps
+"""
+from itertools import islice
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
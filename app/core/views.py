@@ -1,11 +1,56 @@
 """
 Core views for app
 """
+import hmac
 
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_safe
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from core import health
+from core import metrics as api_metrics
+
+
 @api_view(["GET"])
 def health_check(request):
     """Health check endpoint"""
     return Response({"healthy": True})
+
+
+@require_safe
+def liveness(request):
+    """Liveness probe, answers without DRF, sessions or dependencies"""
+    return HttpResponse(b'{"healthy": true}', content_type="application/json")
+
+
+@require_safe
+def readiness(request):
+    """Readiness probe checking the database, media volume and cache"""
+    ready, checks = health.readiness()
+    return JsonResponse(
+        {"ready": ready, "checks": checks},
+        status=200 if ready else 503,
+    )
+
+
+def metrics_authorized(request):
+    """Return if the request carries the METRICS_TOKEN bearer token"""
+    if not settings.METRICS_TOKEN:
+        return False
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    return hmac.compare_digest(
+        header.encode(), f"Bearer {settings.METRICS_TOKEN}".encode(),
+    )
+
+
+def metrics(request):
+    """Prometheus metrics of all workers, for scrapers with the token"""
+    if not metrics_authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(api_metrics.registry()),
+        content_type=CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,95 @@
+"""
+Per-user cache of rendered list responses for recipe APIs
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+VERSION_KEY = "recipe-api:version:{user_id}"
+LIST_KEY = "recipe-api:list:{user_id}:{version}:{digest}"
+
+
+def get_list_version(user_id):
+    """Return the current cache version for a user's lists"""
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() so concurrent first requests settle on a single version
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_list_version(user_id):
+    """Invalidate every cached list for a user"""
+    key = VERSION_KEY.format(user_id=user_id)
+
+    def bump():
+        cache.set(key, uuid.uuid4().hex, None)
+
+    bump()
+    # A request reading between the write and the commit may cache the old
+    # rows under the new version, so bump again once the data is visible
+    transaction.on_commit(bump)
+
+
+class CachedListMixin:
+    """Serve JSON list responses from the user's versioned cache"""
+
+    def _list_cache_key(self, request):
+        """Build the cache key for this list request"""
+        params = sorted(request.query_params.lists())
+        raw = f"{request.get_host()}{request.path}?{params}"
+        return LIST_KEY.format(
+            user_id=request.user.id,
+            version=get_list_version(request.user.id),
+            digest=hashlib.md5(raw.encode()).hexdigest(),
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached rendering or render and store it"""
+        timeout = settings.API_LIST_CACHE_TIMEOUT
+        # The browsable API embeds per-request forms, only cache JSON
+        if not timeout or request.accepted_renderer.format != "json":
+            return super().list(request, *args, **kwargs)
+        key = self._list_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, etag = cached
+            response = HttpResponse(content, content_type=content_type)
+            if etag is None:
+                return response
+            # The entry is only reachable while fresh, so is its ETag
+            response["ETag"] = etag
+            return get_conditional_response(
+                request,
+                etag=etag,
+                response=response,
+            )
+
+        response = super().list(request, *args, **kwargs)
+        if not isinstance(response, Response):
+            # e.g. a 304 from a conditional GET, nothing to cache
+            return response
+
+        def store(rendered):
+            if rendered.status_code == 200:
+                cache.set(
+                    key,
+                    (
+                        rendered.content,
+                        rendered["Content-Type"],
+                        rendered.get("ETag"),
+                    ),
+                    timeout,
+                )
+
+        response.add_post_render_callback(store)
+        return response
@@ -0,0 +1,106 @@
+"""
+Conditional GET support (ETag / Last-Modified) for recipe APIs
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(request, *parts):
+    """Build a strong ETag from the request URL and freshness values"""
+    params = sorted(request.query_params.lists())
+    raw = f"{request.user.id}:{request.path}?{params}:{parts}"
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """Answer If-None-Match and If-Modified-Since without serializing"""
+
+    def _conditional(self, request, response_factory, etag, last_modified):
+        """Return 304 when the client copy is fresh, else the response"""
+        # HTTP dates have whole second precision
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp,
+        )
+        if not_modified is not None:
+            return not_modified
+        response = response_factory()
+        if 200 <= response.status_code < 300:
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """ETag list pages by the ids and updated_at of their rows
+
+    Lists get no Last-Modified, a deleted row never moves the newest
+    updated_at so If-Modified-Since could not notice it.
+    """
+
+    def _page_freshness(self, queryset):
+        """Return (id, updated_at) of the rows on the requested page
+
+        Selects only those and the columns the cursor is built from, no
+        model instances are made.
+        """
+        get_ordering = getattr(self.paginator, "get_ordering", None)
+        if get_ordering is not None:
+            ordering = get_ordering(self.request, queryset, self)
+        else:
+            ordering = queryset.query.order_by
+        columns = dict.fromkeys([
+            "id",
+            "updated_at",
+            *(name.lstrip("-") for name in ordering if isinstance(name, str)),
+        ])
+        queryset = queryset.prefetch_related(None).values(*columns)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            page = queryset
+        return [(row["id"], row["updated_at"].isoformat()) for row in page]
+
+    def list(self, request, *args, **kwargs):
+        """Check the page freshness before building the list"""
+        rows = self._page_freshness(self.filter_queryset(self.get_queryset()))
+        return self._conditional(
+            request,
+            lambda: super(ConditionalListMixin, self).list(
+                request, *args, **kwargs
+            ),
+            make_etag(request, rows),
+            None,
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """ETag and Last-Modified single objects by their updated_at"""
+
+    def retrieve(self, request, *args, **kwargs):
+        """Check the object's updated_at before serializing it"""
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            updated_at = self.filter_queryset(
+                self.get_queryset()
+            ).prefetch_related(None).filter(
+                **{self.lookup_field: kwargs[lookup]}
+            ).values_list("updated_at", flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            # A malformed lookup value, get_object() answers 404
+            updated_at = None
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+        return self._conditional(
+            request,
+            lambda: super(ConditionalRetrieveMixin, self).retrieve(
+                request, *args, **kwargs
+            ),
+            make_etag(request, updated_at.isoformat()),
+            updated_at,
+        )
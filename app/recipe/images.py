@@ -0,0 +1,160 @@
+"""
+Downscaled JPEG and WebP variants of recipe images
+
+Uploads are saved as sent. Once the upload is committed a background
+thread writes one variant per configured width and format and stores
+their names in Recipe.image_variants. Every stored name holds a reference
+in core.storage, released when a recipe stops using it.
+"""
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import Recipe
+from core.storage import acquire, image_storage, release
+from recipe.cache import bump_list_version
+
+logger = logging.getLogger("recipe.images")
+
+VARIANT_DIR = "uploads/recipe/variants"
+# Format name -> (Pillow format, file extension, save options)
+FORMATS = {
+    "jpeg": ("JPEG", "jpg", {"optimize": True, "progressive": True}),
+    "webp": ("WEBP", "webp", {"method": 4}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_names(variants):
+    """Return every storage name in an image_variants value"""
+    return [
+        name
+        for formats in (variants or {}).values()
+        for name in formats.values()
+    ]
+
+
+def target_widths(width):
+    """Return the configured widths for an image, never upscaling
+
+    An image narrower than a configured width gets a variant at its own
+    width instead.
+    """
+    widths = sorted(set(settings.IMAGE_VARIANT_WIDTHS))
+    targets = [target for target in widths if target < width]
+    if len(targets) < len(widths):
+        targets.append(width)
+    return targets
+
+
+def render_variants(image_name):
+    """Write the variants of a stored image, return {width: {format: name}}"""
+    with image_storage.open(image_name) as handle:
+        with Image.open(handle) as original:
+            source = ImageOps.exif_transpose(original).convert("RGB")
+    variants = {}
+    for width in target_widths(source.width):
+        height = max(1, round(source.height * width / source.width))
+        resized = source.resize((width, height), Image.LANCZOS)
+        for name in settings.IMAGE_VARIANT_FORMATS:
+            pillow_format, extension, options = FORMATS[name]
+            buffer = BytesIO()
+            resized.save(
+                buffer,
+                pillow_format,
+                quality=settings.IMAGE_VARIANT_QUALITY,
+                **options,
+            )
+            # Named by content hash, identical variants are shared
+            variants.setdefault(str(width), {})[name] = image_storage.save(
+                posixpath.join(VARIANT_DIR, f"{width}w.{extension}"),
+                ContentFile(buffer.getvalue()),
+            )
+    return variants
+
+
+def process_image(recipe_id, image_name, keep_original=True):
+    """Generate the variants of a recipe's image and record them
+
+    Without keep_original the recipe's image points at its largest
+    variant and the upload is released. Nothing is recorded when the image was
+    replaced or the recipe deleted in the meantime.
+    """
+    variants = render_variants(image_name)
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id,
+            image=image_name,
+        ).only("id", "user_id", "image_variants").first()
+        if recipe is None:
+            release(variant_names(variants))
+            return None
+        stale = variant_names(recipe.image_variants)
+        changes = {"image_variants": variants, "updated_at": timezone.now()}
+        if not keep_original:
+            largest = variants[max(variants, key=int)]
+            changes["image"] = largest.get("jpeg") or next(
+                iter(largest.values())
+            )
+            acquire([changes["image"]])
+            stale.append(image_name)
+        Recipe.objects.filter(pk=recipe_id).update(**changes)
+        # update() sends no signals, drop the cached lists here
+        bump_list_version(recipe.user_id)
+        release(stale)
+    return variants
+
+
+def _process_logged(recipe_id, image_name, keep_original):
+    """Process an image, logging any failure instead of raising it
+
+    The upload is already committed, a failure must not turn its response
+    into an error. generate_image_variants fills in the variants later.
+    """
+    try:
+        process_image(recipe_id, image_name, keep_original)
+    except Exception:
+        logger.exception("Image variants failed for recipe %s", recipe_id)
+
+
+def _run(recipe_id, image_name, keep_original):
+    """Process an image in a worker thread"""
+    try:
+        _process_logged(recipe_id, image_name, keep_original)
+    finally:
+        # Each thread opens its own connections
+        connections.close_all()
+
+
+def schedule_variants(recipe, keep_original=False):
+    """Generate the recipe's image variants once the upload is committed
+
+    Runs in a small thread pool per worker, or inline when
+    IMAGE_VARIANTS_ASYNC is off.
+    """
+    recipe_id, image_name = recipe.id, recipe.image.name
+
+    def submit():
+        global _executor
+        if not settings.IMAGE_VARIANTS_ASYNC:
+            _process_logged(recipe_id, image_name, keep_original)
+            return
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_VARIANT_WORKERS,
+                    thread_name_prefix="image-variants",
+                )
+        _executor.submit(_run, recipe_id, image_name, keep_original)
+
+    transaction.on_commit(submit)
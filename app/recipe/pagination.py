@@ -0,0 +1,28 @@
+"""
+Pagination classes for recipe APIs
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over recipes, newest first"""
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        """Page search results by relevance instead of by id"""
+        if "search_rank" in queryset.query.annotations:
+            return ("-search_rank", "-id")
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(CursorPagination):
+    """Keyset pagination over tags and ingredients by name
+
+    Names are unique per user, so the name alone is a stable cursor key.
+    """
+    ordering = "-name"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
@@ -0,0 +1,80 @@
+"""
+Read-only recipe list rows built from .values() instead of model instances
+"""
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+from django.db.models.functions import JSONObject
+from rest_framework.response import Response
+
+from core.models import (
+    Tag,
+    Ingredient,
+)
+from recipe.serializers import RecipeSerializer
+
+# Recipe relations and the annotation holding their rows
+ROW_RELATIONS = {
+    "tags": (Tag, "tag_rows"),
+    "ingredients": (Ingredient, "ingredient_rows"),
+}
+
+
+def _linked_rows(model):
+    """Return the recipe's linked rows as an array of {id, name} objects"""
+    return ArraySubquery(
+        model.objects.filter(
+            recipe=OuterRef("pk"),
+        ).order_by("id").values(json=JSONObject(id="id", name="name"))
+    )
+
+
+def recipe_rows(queryset):
+    """Select what RecipeSerializer shows as dicts, in a single query"""
+    columns = [
+        name for name in RecipeSerializer.Meta.fields
+        if name not in ROW_RELATIONS
+    ]
+    # The cursor paginator reads its position from the ordering columns
+    if "search_rank" in queryset.query.annotations:
+        columns.append("search_rank")
+    annotations = {
+        key: _linked_rows(model) for model, key in ROW_RELATIONS.values()
+    }
+    return queryset.prefetch_related(None).annotate(
+        **annotations,
+    ).values(*columns, *annotations)
+
+
+def represent_rows(rows):
+    """Render recipe_rows() output exactly as RecipeSerializer would"""
+    fields = RecipeSerializer().fields
+    data = []
+    for row in rows:
+        item = {}
+        for name, field in fields.items():
+            if name in ROW_RELATIONS:
+                keys = list(field.child.fields)
+                item[name] = [
+                    {key: linked[key] for key in keys}
+                    for linked in row[ROW_RELATIONS[name][1]]
+                ]
+            elif row[name] is None:
+                item[name] = None
+            else:
+                item[name] = field.to_representation(row[name])
+        data.append(item)
+    return data
+
+
+class RecipeRowsListMixin:
+    """List recipes from plain rows when the full representation is asked"""
+
+    def list(self, request, *args, **kwargs):
+        """Serve default recipe lists without building model instances"""
+        if self._sparse_params() != (None, None):
+            return super().list(request, *args, **kwargs)
+        queryset = recipe_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(represent_rows(page))
+        return Response(represent_rows(queryset))
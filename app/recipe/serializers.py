@@ -2,6 +2,10 @@
 Serializer for recipe APIs
 """
 
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from core.models import (
@@ -9,8 +13,32 @@ from core.models import (
     Tag,
     Ingredient
 )
+from core.storage import release
+from recipe.images import schedule_variants, variant_names
 
-class IngredientSerializer(serializers.ModelSerializer):
+# Largest number of recipes accepted by one bulk request
+BULK_MAX_ITEMS = 1000
+
+class UniqueNameMixin:
+    """Reject renaming a tag or ingredient to a name the user already has"""
+
+    def validate_name(self, value):
+        """Check the name is free for the requesting user"""
+        # Nested under a recipe, an existing name means "reuse that row"
+        if self.parent is not None:
+            return value
+        queryset = self.Meta.model.objects.filter(
+            user=self.context["request"].user,
+            name=value,
+        )
+        if self.instance is not None:
+            queryset = queryset.exclude(id=self.instance.id)
+        if queryset.exists():
+            raise serializers.ValidationError("This name is already in use.")
+        return value
+
+
+class IngredientSerializer(UniqueNameMixin, serializers.ModelSerializer):
     """Serialize ingredient objects"""
     class Meta:
         model = Ingredient
@@ -18,7 +46,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(UniqueNameMixin, serializers.ModelSerializer):
     """Serailizer for tag objects"""
 
     class Meta:
@@ -26,6 +54,99 @@ class TagSerializer(serializers.ModelSerializer):
         fields=["id", "name"]
         read_only_field=['id']
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Create and update batches of recipes with bulk queries"""
+
+    relations = (("tags", Tag), ("ingredients", Ingredient))
+
+    def _resolve_links(self, items, field, model):
+        """Return each item's resolved rows for field, None when not sent"""
+        names = [attr for item in items for attr in item.get(field) or []]
+        rows = {
+            obj.name: obj
+            for obj in self.child._get_or_create_attrs(model, names)
+        }
+        resolved = []
+        for item in items:
+            if item.get(field) is None:
+                resolved.append(None)
+            else:
+                resolved.append([rows[attr["name"]] for attr in item[field]])
+        return resolved
+
+    def _through(self, field):
+        """Return the through model and its target column for field"""
+        m2m = Recipe._meta.get_field(field)
+        return m2m.remote_field.through, f"{m2m.m2m_reverse_field_name()}_id"
+
+    def _sync_links(self, recipes, links, field, created=False):
+        """Apply link changes for all recipes in one DELETE and one INSERT"""
+        through, column = self._through(field)
+        stale = models.Q()
+        added = []
+        for recipe, targets in zip(recipes, links):
+            if targets is None:
+                continue
+            # New recipes have no links, existing ones are prefetched
+            current = set() if created else {
+                obj.id for obj in getattr(recipe, field).all()
+            }
+            wanted = {obj.id for obj in targets}
+            if current - wanted:
+                stale |= models.Q(
+                    recipe_id=recipe.id,
+                    **{f"{column}__in": current - wanted},
+                )
+            added += [
+                through(recipe_id=recipe.id, **{column: obj_id})
+                for obj_id in wanted - current
+            ]
+        if stale:
+            through.objects.filter(stale).delete()
+        if added:
+            through.objects.bulk_create(added, ignore_conflicts=True)
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Bulk insert recipes and their links"""
+        items = [dict(item) for item in validated_data]
+        links = {
+            field: self._resolve_links(items, field, model)
+            for field, model in self.relations
+        }
+        recipes = Recipe.objects.bulk_create([
+            Recipe(**{
+                attr: value for attr, value in item.items()
+                if attr not in links
+            })
+            for item in items
+        ])
+        for field, field_links in links.items():
+            self._sync_links(recipes, field_links, field, created=True)
+        return recipes
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Bulk apply partial updates, instance is a list of recipes"""
+        recipes = list(instance)
+        items = [dict(item) for item in validated_data]
+        # bulk_update() skips auto_now, so updated_at is always written
+        changed = {"updated_at"}
+        now = timezone.now()
+        for field, model in self.relations:
+            field_links = self._resolve_links(items, field, model)
+            self._sync_links(recipes, field_links, field)
+        for recipe, item in zip(recipes, items):
+            recipe.updated_at = now
+            for attr, value in item.items():
+                if attr not in dict(self.relations):
+                    setattr(recipe, attr, value)
+                    changed.add(attr)
+        if recipes:
+            Recipe.objects.bulk_update(recipes, sorted(changed))
+        return recipes
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializes a recipe object"""
 
@@ -36,53 +157,104 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ['id', 'title', "time_minutes", "price", "link", "tags", "ingredients"]
         read_only_fields = ["id"]
+        list_serializer_class = RecipeListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Get or Create Tags"""
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        """Optionally limit output to fields and nest only expand relations
+
+        When either is given, relations that are not expanded are shown as
+        lists of ids.
+        """
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+        for name in ("tags", "ingredients"):
+            if name in self.fields and name not in (expand or []):
+                self.fields[name] = serializers.PrimaryKeyRelatedField(
+                    many=True,
+                    read_only=True,
+                )
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def _get_or_create_attrs(self, model, items):
+        """Return the user's rows for the given names, creating missing ones"""
         auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
+        names = list(dict.fromkeys(item["name"] for item in items))
+        if not names:
+            return []
+        found = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        missing = [name for name in names if name not in found]
+        if missing:
+            # A concurrent request may insert the same names first, skip
+            # those rows on conflict and read back whatever won
+            model.objects.bulk_create(
+                [model(user=auth_user, name=name) for name in missing],
+                ignore_conflicts=True,
             )
-            recipe.tags.add(tag_obj)
+            created = model.objects.filter(user=auth_user, name__in=missing)
+            found.update((obj.name, obj) for obj in created)
+        return [found[name] for name in names]
+
+    def _get_or_create_tags(self, tags, recipe):
+        """Get or Create Tags"""
+        recipe.tags.add(*self._get_or_create_attrs(Tag, tags))
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """get or create ingredients"""
-        auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        recipe.ingredients.add(
+            *self._get_or_create_attrs(Ingredient, ingredients)
+        )
+
+    def _sync_attrs(self, manager, targets):
+        """Link exactly targets, touching only the through rows that change"""
+        # Reads the prefetched links when the view loaded them
+        current = {obj.id for obj in manager.all()}
+        wanted = {obj.id for obj in targets}
+        stale = current - wanted
+        if stale:
+            manager.remove(*stale)
+        added = [obj for obj in targets if obj.id not in current]
+        if added:
+            manager.add(*added)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create and return new recipe"""
         tags = validated_data.pop("tags", [])
         ingredients = validated_data.pop("ingredients", [])
         recipe = Recipe.objects.create(**validated_data)
-        # auth_user = self.context["request"].user
-        # for tag in tags:
-        #     tag_obj, created = Tag.objects.get_or_create(
-        #         user=auth_user,
-        #         **tag,
-        #     )
-        #     recipe.tags.add(tag_obj)
         self._get_or_create_tags(tags, recipe)
         self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Update an existing recipe"""
+        """Update an existing recipe
+
+        Tags and ingredients are diffed against the current links. With the
+        links prefetched by the view, each relation in the payload costs:
+        one lookup when nothing changed, plus one DELETE when links are
+        dropped, plus one INSERT when links are added (and a SELECT of the
+        existing links, since m2m_changed receivers are connected), plus
+        two more (insert and re-read) when brand new names are created.
+        """
         tags = validated_data.pop("tags", None)
         ingredients = validated_data.pop("ingredients", None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._sync_attrs(
+                instance.tags,
+                self._get_or_create_attrs(Tag, tags),
+            )
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._sync_attrs(
+                instance.ingredients,
+                self._get_or_create_attrs(Ingredient, ingredients),
+            )
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
@@ -90,15 +262,84 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
+    image_variants = serializers.SerializerMethodField()
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_variants',
+        ]
+
+    @extend_schema_field({
+        "type": "object",
+        "nullable": True,
+        "additionalProperties": {
+            "type": "object",
+            "additionalProperties": {"type": "string", "format": "uri"},
+        },
+        "example": {"320": {"jpeg": "http://example.com/x-320w.jpg"}},
+    })
+    def get_image_variants(self, recipe):
+        """Return {width: {format: url}}, None until they are generated"""
+        if not recipe.image_variants:
+            return None
+        request = self.context.get("request")
+        variants = {}
+        for width, formats in recipe.image_variants.items():
+            variants[width] = {}
+            for name, path in formats.items():
+                url = default_storage.url(path)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[width][name] = url
+        return variants
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """serializer for uploading images to recipe"""
+    keep_original = serializers.BooleanField(
+        default=False,
+        write_only=True,
+        help_text="Keep the uploaded file, otherwise only the resized "
+                  "variants are stored.",
+    )
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'keep_original')
         read_only_fiels = ['id']
-        extra_kwargs={'image' : {'required': 'True'}}
+        extra_kwargs={'image' : {
+            'required': 'True',
+            'help_text': "Null in the response unless keep_original is "
+                         "set, the upload is then replaced by its largest "
+                         "variant. Read the recipe for the new URLs.",
+        }}
+
+    def to_representation(self, instance):
+        """Leave out the URL of an upload that will not be kept"""
+        data = super().to_representation(instance)
+        if hasattr(self, '_validated_data') and \
+                not self.validated_data.get('keep_original', True):
+            data['image'] = None
+        return data
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Store the upload and queue its variants for after the commit"""
+        keep_original = validated_data.pop("keep_original")
+        stale = variant_names(instance.image_variants)
+        if instance.image:
+            stale.append(instance.image.name)
+        instance.image_variants = None
+        recipe = super().update(instance, validated_data)
+        # Files no other recipe uses are deleted after the commit
+        release(stale)
+        schedule_variants(recipe, keep_original)
+        return recipe
+
+
+class RecipeBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for a batch of recipe ids to delete"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=BULK_MAX_ITEMS,
+    )
@@ -0,0 +1,76 @@
+"""
+Signal handlers keeping recipe timestamps, the list cache and image
+references in step with the data
+"""
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.utils import timezone
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.cache import bump_list_version
+from core.storage import release
+from recipe.images import variant_names
+
+
+def touch_recipes(recipes):
+    """Move updated_at forward on the given recipe queryset"""
+    recipes.update(updated_at=timezone.now())
+
+
+def invalidate_owner_lists(sender, instance, **kwargs):
+    """Drop cached lists of the user owning a changed row"""
+    bump_list_version(instance.user_id)
+
+
+def touch_linked_recipes(sender, instance, created=False, **kwargs):
+    """Mark recipes showing a renamed or deleted tag or ingredient changed"""
+    if not created:
+        touch_recipes(Recipe.objects.filter(**{
+            f"{sender._meta.model_name}s": instance,
+        }))
+
+
+def handle_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Touch recipes and drop cached lists when links change"""
+    if action == "pre_clear" and reverse:
+        # The cleared recipe ids are gone by post_clear, collect them now
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list("id", flat=True)
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif action == "post_clear":
+        touch_recipes(Recipe.objects.filter(
+            pk__in=getattr(instance, "_cleared_recipe_ids", []),
+        ))
+    else:
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    bump_list_version(instance.user_id)
+
+
+def release_images(sender, instance, **kwargs):
+    """Release a deleted recipe's image and variants"""
+    release([instance.image.name, *variant_names(instance.image_variants)])
+
+
+def connect():
+    """Connect timestamp and cache upkeep to recipe, tag, ingredient writes"""
+    for model in (Recipe, Tag, Ingredient):
+        post_save.connect(invalidate_owner_lists, sender=model)
+        post_delete.connect(invalidate_owner_lists, sender=model)
+    post_delete.connect(release_images, sender=Recipe)
+    for model in (Tag, Ingredient):
+        post_save.connect(touch_linked_recipes, sender=model)
+        pre_delete.connect(touch_linked_recipes, sender=model)
+    for through in (Recipe.tags.through, Recipe.ingredients.through):
+        m2m_changed.connect(handle_links_changed, sender=through)
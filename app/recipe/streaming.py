@@ -0,0 +1,84 @@
+"""
+Opt-in streaming of unpaginated list responses for recipe APIs
+"""
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+
+from core.renderers import FastJSONRenderer
+from core.utils import chunked
+
+# ?stream= value and the content type it is served with
+STREAM_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+STREAM_PARAMETER = OpenApiParameter(
+    "stream",
+    OpenApiTypes.STR,
+    enum=list(STREAM_FORMATS),
+    description="Stream every result, unpaginated, as a JSON array or as "
+                "newline delimited JSON.",
+)
+
+
+class StreamingListMixin:
+    """Stream the whole list with ?stream=json or ?stream=ndjson
+
+    Rows are read through a server-side cursor and written chunk by chunk,
+    so memory use does not grow with the number of results.
+    """
+    stream_chunk_size = 500
+    stream_renderer_class = FastJSONRenderer
+
+    def list(self, request, *args, **kwargs):
+        """Stream the list when asked to, else build it as usual"""
+        stream = request.query_params.get("stream")
+        if stream is None:
+            return super().list(request, *args, **kwargs)
+        if stream not in STREAM_FORMATS:
+            raise ValidationError({
+                "stream": [f"Choose one of: {', '.join(STREAM_FORMATS)}."],
+            })
+        queryset = self.filter_queryset(self.get_queryset())
+        chunks = self.get_stream_chunks(queryset)
+        if stream == "ndjson":
+            content = self._ndjson_lines(chunks)
+        else:
+            content = self._json_array(chunks)
+        return StreamingHttpResponse(
+            content,
+            content_type=STREAM_FORMATS[stream],
+        )
+
+    def get_stream_chunks(self, queryset):
+        """Yield lists of serialized items, one chunk of rows at a time"""
+        # iterator() skips prefetching, run it per chunk instead
+        lookups = queryset._prefetch_related_lookups
+        rows = queryset.prefetch_related(None).iterator(
+            chunk_size=self.stream_chunk_size,
+        )
+        for chunk in chunked(rows, self.stream_chunk_size):
+            prefetch_related_objects(chunk, *lookups)
+            yield self.get_serializer(chunk, many=True).data
+
+    def _json_array(self, chunks):
+        """Write the chunks as the items of a single JSON array"""
+        renderer = self.stream_renderer_class()
+        yield b"["
+        separator = b""
+        for data in chunks:
+            if data:
+                # Drop the brackets of the rendered chunk array
+                yield separator + renderer.render(data)[1:-1]
+                separator = b","
+        yield b"]"
+
+    def _ndjson_lines(self, chunks):
+        """Write each item as its own JSON line"""
+        renderer = self.stream_renderer_class()
+        for data in chunks:
+            yield b"".join(renderer.render(item) + b"\n" for item in data)
@@ -0,0 +1,155 @@
+"""
+Tests for ETag / Last-Modified conditional GETs
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def detail_url(recipe_id):
+    """Return recipe details URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    """Test recipe resources answer conditional requests"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="Sample recipe",
+            time_minutes=10,
+            price=Decimal("5.00"),
+        )
+
+    def test_detail_not_modified(self):
+        """Test a detail request with a matching ETag returns 304"""
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertIn("ETag", res)
+        self.assertIn("Last-Modified", res)
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+    def test_detail_modified_since(self):
+        """Test If-Modified-Since answers 304 only for older changes"""
+        future = http_date((timezone.now() + timedelta(hours=1)).timestamp())
+        past = http_date((timezone.now() - timedelta(hours=1)).timestamp())
+
+        fresh = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_MODIFIED_SINCE=future,
+        )
+        stale = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_MODIFIED_SINCE=past,
+        )
+
+        self.assertEqual(fresh.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+
+    def test_detail_etag_changes_with_links(self):
+        """Test linking a tag or renaming it changes the detail ETag"""
+        first = self.client.get(detail_url(self.recipe.id))["ETag"]
+        tag = Tag.objects.create(user=self.user, name="Lunch")
+        self.recipe.tags.add(tag)
+        second = self.client.get(detail_url(self.recipe.id))["ETag"]
+        tag.name = "Dinner"
+        tag.save()
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_NONE_MATCH=second,
+        )
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["tags"][0]["name"], "Dinner")
+
+    def test_detail_invalid_id_not_found(self):
+        """Test a non-numeric detail id returns 404"""
+        res = self.client.get(detail_url("abc"))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail_invalid_id_with_etag_not_found(self):
+        """Test If-None-Match with a non-numeric detail id returns 404"""
+        etag = self.client.get(detail_url(self.recipe.id))["ETag"]
+
+        res = self.client.get(detail_url("abc"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_not_modified(self):
+        """Test a list request with a matching ETag returns 304"""
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_freshness_selects_only_timestamps(self):
+        """Test the list ETag is computed without loading full rows"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPE_URL, {"search": "sample"})
+
+        freshness = ctx.captured_queries[0]["sql"]
+        columns = freshness[:freshness.index(" FROM ")]
+        self.assertIn('"updated_at"', columns)
+        self.assertNotIn('"title"', columns)
+        self.assertNotIn('"description"', columns)
+
+    def test_list_modified_after_delete(self):
+        """Test deleting a recipe invalidates the list ETag"""
+        Recipe.objects.create(
+            user=self.user,
+            title="Second",
+            time_minutes=1,
+            price=Decimal("1.00"),
+        )
+        etag = self.client.get(RECIPE_URL)["ETag"]
+        self.recipe.delete()
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()["results"]), 1)
+
+    def test_tag_list_not_modified(self):
+        """Test tag lists answer conditional requests"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        etag = self.client.get(TAGS_URL)["ETag"]
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
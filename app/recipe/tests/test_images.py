@@ -0,0 +1,232 @@
+"""
+Tests for recipe image variants
+"""
+import os
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.images import process_image, variant_names
+
+
+def detail_url(recipe_id):
+    """Return recipe details URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    """Return image upload URL"""
+    return reverse("recipe:recipe-upload-image", args=[recipe_id])
+
+
+def jpeg_file(width, height):
+    """Return an uploadable JPEG of the given size"""
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buffer, "JPEG")
+    return SimpleUploadedFile(
+        "photo.jpg", buffer.getvalue(), content_type="image/jpeg",
+    )
+
+
+def stored_size(name):
+    """Return the pixel size and format of a stored image"""
+    with default_storage.open(name) as handle:
+        with Image.open(handle) as image:
+            return image.size, image.format
+
+
+class ImageVariantTests(TestCase):
+    """Test resized variants are made from uploads."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name,
+            IMAGE_VARIANT_WIDTHS=[16, 32],
+            IMAGE_VARIANT_FORMATS=["jpeg", "webp"],
+            IMAGE_VARIANTS_ASYNC=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="Sample recipe",
+            time_minutes=22,
+            price=Decimal("5.25"),
+        )
+
+    def _upload(self, image, **data):
+        """Upload an image and run the after-commit processing"""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                image_upload_url(self.recipe.id),
+                {"image": image, **data},
+                format="multipart",
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        return res
+
+    def test_variants_generated(self):
+        """Test each width and format is written and linked on the detail"""
+        self._upload(jpeg_file(40, 20), keep_original=True)
+
+        variants = self.recipe.image_variants
+        self.assertEqual(set(variants), {"16", "32"})
+        self.assertEqual(
+            stored_size(variants["16"]["jpeg"]), ((16, 8), "JPEG"),
+        )
+        self.assertEqual(
+            stored_size(variants["32"]["webp"]), ((32, 16), "WEBP"),
+        )
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+        self.assertEqual(stored_size(self.recipe.image.name)[0], (40, 20))
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(
+            res.data["image_variants"]["16"]["webp"],
+            "http://testserver" + default_storage.url(variants["16"]["webp"]),
+        )
+
+    def test_original_dropped_by_default(self):
+        """Test the upload is replaced by its largest JPEG variant"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(
+                image_upload_url(self.recipe.id),
+                {"image": jpeg_file(40, 20)},
+                format="multipart",
+            )
+        self.recipe.refresh_from_db()
+        original = self.recipe.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+
+        self.recipe.refresh_from_db()
+        self.assertFalse(default_storage.exists(original))
+        self.assertEqual(
+            self.recipe.image.name, self.recipe.image_variants["32"]["jpeg"],
+        )
+
+    def test_upload_response_image(self):
+        """Test the upload URL is only returned when the file is kept"""
+        dropped = self._upload(jpeg_file(40, 20))
+        self.assertIsNone(dropped.data["image"])
+
+        kept = self._upload(jpeg_file(40, 40), keep_original=True)
+
+        self.assertEqual(
+            kept.data["image"],
+            "http://testserver" + default_storage.url(self.recipe.image.name),
+        )
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+
+    def test_small_image_not_upscaled(self):
+        """Test an image narrower than the widths keeps its own width"""
+        self._upload(jpeg_file(20, 20), keep_original=True)
+
+        self.assertEqual(set(self.recipe.image_variants), {"16", "20"})
+        self.assertEqual(
+            stored_size(self.recipe.image_variants["20"]["jpeg"])[0], (20, 20),
+        )
+
+    def test_inline_failure_logged(self):
+        """Test a failing inline variant run leaves the upload in place"""
+        with mock.patch(
+            "recipe.images.render_variants",
+            side_effect=OSError("disk full"),
+        ), self.assertLogs("recipe.images", "ERROR"):
+            res = self._upload(jpeg_file(40, 20))
+
+        self.assertIsNone(self.recipe.image_variants)
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+        self.assertIsNone(res.data["image"])
+
+    def test_variants_pending_in_detail(self):
+        """Test the detail shows no variants before they are generated"""
+        self.client.post(
+            image_upload_url(self.recipe.id),
+            {"image": jpeg_file(40, 20)},
+            format="multipart",
+        )
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertIsNone(res.data["image_variants"])
+
+    def test_replace_removes_old_variants(self):
+        """Test uploading a new image deletes the previous variants"""
+        self._upload(jpeg_file(40, 20), keep_original=True)
+        old = variant_names(self.recipe.image_variants)
+
+        self._upload(jpeg_file(40, 40), keep_original=True)
+
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+        self.assertTrue(all(
+            default_storage.exists(name)
+            for name in variant_names(self.recipe.image_variants)
+        ))
+
+    def test_delete_recipe_removes_variants(self):
+        """Test deleting a recipe deletes its variants"""
+        self._upload(jpeg_file(40, 20), keep_original=True)
+        names = variant_names(self.recipe.image_variants)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail_url(self.recipe.id))
+
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    def test_replaced_image_not_recorded(self):
+        """Test variants of an image replaced meanwhile are discarded"""
+        self.recipe.image.save("first.jpg", jpeg_file(40, 20))
+        first = self.recipe.image.name
+        self.recipe.image.save("second.jpg", jpeg_file(40, 40))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(process_image(self.recipe.id, first))
+
+        self.recipe.refresh_from_db()
+        self.assertIsNone(self.recipe.image_variants)
+        variants_dir = os.path.join(
+            default_storage.location, "uploads", "recipe", "variants",
+        )
+        self.assertEqual(
+            [name for _, _, files in os.walk(variants_dir) for name in files],
+            [],
+        )
+
+    def test_command_backfills_missing_variants(self):
+        """Test the command generates variants of existing images"""
+        self.recipe.image.save("old.jpg", ContentFile(
+            jpeg_file(40, 20).read()
+        ))
+        out = StringIO()
+
+        call_command("generate_image_variants", stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(set(self.recipe.image_variants), {"16", "32"})
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+        self.assertIn("Generated variants for 1 images", out.getvalue())
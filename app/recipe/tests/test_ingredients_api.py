@@ -18,6 +18,7 @@ from core.models import (
 )
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
+AUTOCOMPLETE_URL = reverse("recipe:ingredient-autocomplete")
 
 def detail_url(ingredient_id):
     """Return ingredient details URL"""
@@ -60,7 +61,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredient = Ingredient.objects.all().order_by("-name")
         serializer = IngredientSerializer(ingredient, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that only the users ingredients are returned"""
@@ -71,9 +72,9 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], ingredient.name)
-        self.assertEqual(res.data[0]["id"], ingredient.id)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], ingredient.name)
+        self.assertEqual(res.data["results"][0]["id"], ingredient.id)
 
     def test_update_ingredient(self):
         """Test updating an ingredient"""
@@ -112,8 +113,8 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL, {'assigned_only':1})
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data , res.data)
-        self.assertNotIn(serializer2.data , res.data)
+        self.assertIn(serializer1.data , res.data["results"])
+        self.assertNotIn(serializer2.data , res.data["results"])
 
     def test_filtered_ingredients_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -136,4 +137,50 @@ class PrivateIngredientsApiTests(TestCase):
         recipe2.ingredients.add(ingredient1)
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only':1})
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_autocomplete_ingredients_by_prefix(self):
+        """Test autocomplete ranks prefix matches by usage"""
+        chicken = Ingredient.objects.create(user=self.user, name="Chicken")
+        chickpeas = Ingredient.objects.create(user=self.user, name="Chickpeas")
+        Ingredient.objects.create(user=self.user, name="Salt")
+        Ingredient.objects.create(
+            user=create_user(email="other@example.com"),
+            name="Chicken",
+        )
+        recipe = Recipe.objects.create(
+            title="Hummus",
+            time_minutes=10,
+            price=2.50,
+            user=self.user,
+        )
+        recipe.ingredients.add(chickpeas)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "chick"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["id"] for item in res.data],
+            [chickpeas.id, chicken.id],
+        )
+
+    def test_autocomplete_ingredients_tolerates_typos(self):
+        """Test autocomplete finds names despite a misspelling"""
+        garlic = Ingredient.objects.create(user=self.user, name="Garlic")
+        Ingredient.objects.create(user=self.user, name="Ginger")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "garlik"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]["id"], garlic.id)
+        self.assertEqual(len(res.data), 1)
+
+    def test_autocomplete_ingredients_limit(self):
+        """Test autocomplete returns at most limit suggestions"""
+        for name in ("Pepper", "Peppercorn", "Pepperoni"):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "pep", "limit": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
@@ -0,0 +1,145 @@
+"""
+Tests for the per-user list response cache
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def create_recipe(user, **params):
+    """Create a recipe for the given user"""
+    defaults = {
+        "title": "Sample recipe",
+        "time_minutes": 10,
+        "price": Decimal("5.00"),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(API_LIST_CACHE_TIMEOUT=300)
+class ListCacheTests(TestCase):
+    """Test cached list responses and their invalidation"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+
+    def _titles(self, res):
+        """Return recipe titles from a list response"""
+        return [recipe["title"] for recipe in res.json()["results"]]
+
+    def test_repeated_list_served_from_cache(self):
+        """Test an identical list request runs no queries"""
+        create_recipe(self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(first.content, second.content)
+
+    def test_cache_keyed_by_filters(self):
+        """Test different query params are cached separately"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        create_recipe(self.user, title="Salad").tags.add(tag)
+        create_recipe(self.user, title="Steak")
+
+        everything = self.client.get(RECIPE_URL)
+        filtered = self.client.get(RECIPE_URL, {"tags": tag.id})
+
+        self.assertEqual(self._titles(everything), ["Steak", "Salad"])
+        self.assertEqual(self._titles(filtered), ["Salad"])
+
+    def test_save_invalidates_cache(self):
+        """Test creating and editing recipes refreshes the list"""
+        recipe = create_recipe(self.user, title="Old")
+        self.client.get(RECIPE_URL)
+
+        recipe.title = "New"
+        recipe.save()
+        create_recipe(self.user, title="Another")
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(self._titles(res), ["Another", "New"])
+
+    def test_m2m_change_invalidates_cache(self):
+        """Test linking a tag refreshes the recipe list"""
+        recipe = create_recipe(self.user)
+        self.client.get(RECIPE_URL)
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Lunch"))
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.json()["results"][0]["tags"][0]["name"], "Lunch")
+
+    def test_tag_rename_invalidates_cache(self):
+        """Test renaming a tag refreshes the tag list"""
+        tag = Tag.objects.create(user=self.user, name="Brunch")
+        self.client.get(TAGS_URL)
+
+        self.client.patch(reverse("recipe:tag-detail", args=[tag.id]), {
+            "name": "Supper",
+        })
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.json()["results"][0]["name"], "Supper")
+
+    def test_bulk_create_invalidates_cache(self):
+        """Test bulk created recipes show up in the next list"""
+        self.client.get(RECIPE_URL)
+
+        self.client.post(
+            reverse("recipe:recipe-bulk-create"),
+            [{"title": "Bulk", "time_minutes": 1, "price": "1.00"}],
+            format="json",
+        )
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(self._titles(res), ["Bulk"])
+
+    def test_cache_is_per_user(self):
+        """Test one user's cached list is never served to another"""
+        create_recipe(self.user, title="Mine")
+        self.client.get(RECIPE_URL)
+        other = get_user_model().objects.create_user(
+            "other@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(self._titles(res), [])
+
+    @override_settings(API_LIST_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        """Test a zero timeout turns the cache off"""
+        self.client.get(RECIPE_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPE_URL)
+
+        self.assertGreater(len(ctx.captured_queries), 0)
@@ -0,0 +1,170 @@
+"""
+Tests that the hot recipe API queries are served by indexes
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+PAGE_SIZE = 5
+ROWS_PER_USER = 100
+USERS = 20
+TAG_AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
+
+
+def discourage_seqscans():
+    """Make the planner prefer indexes for the rest of the transaction"""
+    with connection.cursor() as cursor:
+        # Statistics drift with other tests, e.g. the seeding commands,
+        # refresh them from this test's rows
+        for table in ("core_recipe", "core_tag", "core_ingredient"):
+            cursor.execute(f"ANALYZE {table}")
+        # Test tables are tiny, force the planner to show index choices
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_bitmapscan = off")
+
+
+def explain(sql):
+    """Return the postgres plan for a captured query"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}")
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+class ListQueryPlanTests(TestCase):
+    """Test list queries use index scans instead of sort-after-filter"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Several pages per user, so reading a page in index order beats
+        # sorting the user's rows, and enough users that walking the
+        # primary key and filtering by user does not pay off either
+        owners = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"user{i}@example.com")
+            for i in range(USERS)
+        )
+        cls.user = owners[0]
+        for owner in owners:
+            Recipe.objects.bulk_create(
+                Recipe(
+                    user=owner,
+                    title=f"Recipe {i}",
+                    time_minutes=5,
+                    price=Decimal("1.00"),
+                )
+                for i in range(ROWS_PER_USER)
+            )
+            Tag.objects.bulk_create(
+                Tag(user=owner, name=f"Tag {i}")
+                for i in range(ROWS_PER_USER)
+            )
+            Ingredient.objects.bulk_create(
+                Ingredient(user=owner, name=f"Ingredient {i}")
+                for i in range(ROWS_PER_USER)
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        discourage_seqscans()
+
+    def _list_query(self, url, table):
+        """Return the main SELECT a list endpoint runs against table"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {"page_size": PAGE_SIZE})
+        prefix = f'SELECT "{table}".'
+        return next(
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith(prefix)
+        )
+
+    def assertIndexOrdered(self, plan, index):
+        """Assert a plan reads index in order without a sort step"""
+        self.assertIn(f"using {index} on", plan)
+        self.assertNotIn("Sort", plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    def test_recipe_list_uses_index(self):
+        """Test recipe list is read from the (user, -id) index"""
+        sql = self._list_query(RECIPE_URL, "core_recipe")
+
+        self.assertIndexOrdered(explain(sql), "recipe_user_id_desc_idx")
+
+    def test_tag_list_uses_index(self):
+        """Test tag list is read from the (user, name) index"""
+        sql = self._list_query(TAGS_URL, "core_tag")
+
+        self.assertIndexOrdered(explain(sql), "unique_tag_name_per_user")
+
+    def test_ingredient_list_uses_index(self):
+        """Test ingredient list is read from the (user, name) index"""
+        sql = self._list_query(INGREDIENTS_URL, "core_ingredient")
+
+        self.assertIndexOrdered(
+            explain(sql), "unique_ingredient_name_per_user",
+        )
+
+    def test_tag_name_lookup_uses_index(self):
+        """Test looking up a tag by user and name uses an index"""
+        plan = Tag.objects.filter(user=self.user, name="Tag 1").explain()
+
+        self.assertIn("unique_tag_name_per_user", plan)
+
+
+class AutocompleteQueryPlanTests(TestCase):
+    """Test autocomplete filters through the trigram index"""
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # With few rows the planner prefers the user_id btree indexes
+            # and filters the names, drop them for this transaction so the
+            # plan shows which conditions the trigram index can serve
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = "
+                "'core_tag' AND indexname LIKE 'core_tag_user_id%%'"
+            )
+            for name, in cursor.fetchall():
+                cursor.execute(f'DROP INDEX "{name}"')
+            cursor.execute(
+                "ALTER TABLE core_tag "
+                "DROP CONSTRAINT unique_tag_name_per_user"
+            )
+            # GIN indexes are only read through bitmap scans
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_indexscan = off")
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f"Tag {i}")
+
+    def test_tag_autocomplete_uses_trigram_index(self):
+        """Test prefix and similarity matches are both index conditions"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(TAG_AUTOCOMPLETE_URL, {"q": "ta"})
+        sql = next(
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith('SELECT "core_tag".')
+        )
+
+        plan = explain(sql)
+
+        self.assertIn("Bitmap Index Scan on tag_user_name_trgm_idx", plan)
+        self.assertIn("Index Cond: ((name)::text ~* '^ta'::text)", plan)
+        self.assertIn("Index Cond: ((name)::text %> 'ta'::text)", plan)
@@ -3,9 +3,13 @@
 """
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Prefetch
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import (
@@ -28,6 +32,12 @@ def detail_url(recipe_id):
     """Return recipe details URL"""
     return reverse("recipe:recipe-detail", args=[recipe_id])
 
+
+BULK_CREATE_URL = reverse("recipe:recipe-bulk-create")
+BULK_UPDATE_URL = reverse("recipe:recipe-bulk-update")
+BULK_DELETE_URL = reverse("recipe:recipe-bulk-delete")
+
+
 def image_upload_url(recipe_id):
     """Return recipe upload url"""
     return reverse('recipe:recipe-upload-image',args=[recipe_id])
@@ -51,6 +61,24 @@ def create_user(**params):
     """Create and authenticate an user with email & password"""
     return get_user_model().objects.create_user(**params)
 
+
+class QueryBudgetMixin:
+    """Assert a block of code stays within a fixed number of queries"""
+
+    def assertMaxQueries(self, budget, func, *args, **kwargs):
+        """Call func and fail if it ran more than budget queries"""
+        with CaptureQueriesContext(connection) as ctx:
+            result = func(*args, **kwargs)
+        executed = len(ctx.captured_queries)
+        if executed > budget:
+            queries = "\n".join(q["sql"] for q in ctx.captured_queries)
+            self.fail(
+                f"{executed} queries executed, "
+                f"budget is {budget}:\n{queries}"
+            )
+        return result
+
+
 class PublicRecipeApiTests(TestCase):
     """Test unauthenticated recipes API access"""
 
@@ -63,7 +91,7 @@ class PublicRecipeApiTests(TestCase):
         res = self.client.get(RECIPE_URL)
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
-class PrivateRecipeApiTests(TestCase):
+class PrivateRecipeApiTests(QueryBudgetMixin, TestCase):
     """Test authenticated recipe API access"""
     def setUp(self):
         self.client = APIClient()
@@ -84,7 +112,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by("-id")
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code , status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test that only recips for logged in users are returned"""
@@ -101,7 +129,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes,many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test getting the details of an individual recipe"""
@@ -281,6 +309,50 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.tags.count(), 0)
 
+    def test_update_recipe_tags_keeps_unchanged_links(self):
+        """Test swapping one tag leaves the other through rows in place"""
+        recipe = create_recipe(user=self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("Breakfast", "Lunch", "Dinner")
+        ]
+        recipe.tags.add(*tags[:2])
+        through = Recipe.tags.through
+        kept_row = through.objects.get(recipe=recipe, tag=tags[0])
+
+        payload = {"tags": [{"name": "Breakfast"}, {"name": "Dinner"}]}
+        res = self.assertMaxQueries(
+            14, self.client.patch, detail_url(recipe.id), payload,
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)),
+            {"Breakfast", "Dinner"},
+        )
+        self.assertTrue(through.objects.filter(id=kept_row.id).exists())
+
+    def test_update_recipe_unchanged_tags_writes_no_links(self):
+        """Test resending the same tags does not touch the through table"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        recipe.tags.add(tag)
+
+        payload = {"tags": [{"name": "Breakfast"}]}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(recipe.id), payload, format="json",
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            q["sql"] for q in ctx.captured_queries
+            if "core_recipe_tags" in q["sql"]
+            and q["sql"].startswith(("INSERT", "DELETE"))
+        ]
+        self.assertEqual(writes, [])
+
     def test_create_recipe_with_new_ingredients(self):
         """Test creating a new recipe with ingredients"""
         payload = {
@@ -365,6 +437,41 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_create_recipe_tags_ingredients_query_budget(self):
+        """Test tags and ingredients are resolved in constant queries"""
+        Tag.objects.create(user=self.user, name="Tag 0")
+        Ingredient.objects.create(user=self.user, name="Ingredient 0")
+        payload = {
+            "title": "Big Stew",
+            "time_minutes": 90,
+            "price": Decimal("12.50"),
+            "tags": [{"name": f"Tag {i}"} for i in range(30)],
+            "ingredients": [{"name": f"Ingredient {i}"} for i in range(30)],
+        }
+        res = self.assertMaxQueries(
+            17, self.client.post, RECIPE_URL, payload, format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_create_recipe_repeated_tag_names(self):
+        """Test repeating a tag name in one payload links a single tag"""
+        payload = {
+            "title": "Toast",
+            "time_minutes": 2,
+            "price": Decimal("1.00"),
+            "tags": [{"name": "Breakfast"}, {"name": "Breakfast"}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["tags"]), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags"""
         r1 = create_recipe(user=self.user, title="Thai Vegetable Curry")
@@ -381,9 +488,9 @@ class PrivateRecipeApiTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
 
     def test_filter_by_ingredients(self):
         """ Filter by ingredients"""
@@ -401,9 +508,359 @@ class PrivateRecipeApiTests(TestCase):
         serializer1 = RecipeSerializer(r1)
         serializer2 = RecipeSerializer(r2)
         serializer3 = RecipeSerializer(r3)
-        self.assertIn(serializer1.data,res.data)
-        self.assertIn(serializer2.data,res.data)
-        self.assertNotIn(serializer3.data,res.data)
+        self.assertIn(serializer1.data,res.data["results"])
+        self.assertIn(serializer2.data,res.data["results"])
+        self.assertNotIn(serializer3.data,res.data["results"])
+
+    def test_list_recipes_paginated(self):
+        """Test recipes are returned in cursor pages newest first"""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPE_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["previous"])
+        ids = [r["id"] for r in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            ids += [r["id"] for r in res.data["results"]]
+        self.assertEqual(ids, sorted((r.id for r in recipes), reverse=True))
+
+    def test_search_recipes(self):
+        """Test full text search ranks title matches above description"""
+        in_title = create_recipe(
+            user=self.user,
+            title="Thai Green Curry",
+            description="Coconut milk and basil",
+        )
+        in_description = create_recipe(
+            user=self.user,
+            title="Rice Bowl",
+            description="Leftover curries over rice",
+        )
+        create_recipe(user=self.user, title="Pancakes", description="Sweet")
+        create_recipe(
+            user=create_user(email="other@example.com", password="test123"),
+            title="Curry Puffs",
+        )
+
+        res = self.client.get(RECIPE_URL, {"search": "curry"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [r["id"] for r in res.data["results"]]
+        self.assertEqual(ids, [in_title.id, in_description.id])
+
+    def test_search_recipes_updates_with_edits(self):
+        """Test editing a recipe refreshes its search vector"""
+        recipe = create_recipe(user=self.user, title="Plain Toast")
+        self.client.patch(detail_url(recipe.id), {"title": "Garlic Bread"})
+
+        res = self.client.get(RECIPE_URL, {"search": "garlic"})
+
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]],
+            [recipe.id],
+        )
+
+    def test_search_recipes_paginated(self):
+        """Test paging through search results visits every match once"""
+        recipes = [
+            create_recipe(
+                user=self.user,
+                title=f"Soup {i}",
+                description="soup " * (i % 3),
+            )
+            for i in range(7)
+        ]
+
+        res = self.client.get(RECIPE_URL, {"search": "soup", "page_size": 2})
+        ids = [r["id"] for r in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            ids += [r["id"] for r in res.data["results"]]
+
+        self.assertEqual(sorted(ids), sorted(r.id for r in recipes))
+
+    def test_bulk_create_recipes(self):
+        """Test creating a batch of recipes reports a result per item"""
+        Tag.objects.create(user=self.user, name="Dinner")
+        payload = [
+            {
+                "title": f"Recipe {i}",
+                "time_minutes": 10,
+                "price": "2.50",
+                "tags": [{"name": "Dinner"}, {"name": f"Tag {i}"}],
+                "ingredients": [{"name": "Salt"}],
+            }
+            for i in range(10)
+        ]
+        payload.insert(1, {"title": "Missing fields"})
+
+        res = self.assertMaxQueries(
+            14, self.client.post, BULK_CREATE_URL, payload, format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data["results"]
+        self.assertEqual(len(results), 11)
+        self.assertEqual(results[1]["status"], status.HTTP_400_BAD_REQUEST)
+        self.assertIn("time_minutes", results[1]["errors"])
+        self.assertEqual(results[0]["status"], status.HTTP_201_CREATED)
+        self.assertEqual(results[0]["data"]["title"], "Recipe 0")
+        recipe = Recipe.objects.get(id=results[2]["data"]["id"])
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(recipe.title, "Recipe 1")
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)),
+            {"Dinner", "Tag 1"},
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 10)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 11)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_requires_list(self):
+        """Test a bulk create body that is not a list is rejected"""
+        payload = {"title": "Single", "time_minutes": 1, "price": "1.00"}
+        res = self.client.post(BULK_CREATE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating a batch of recipes"""
+        r1 = create_recipe(user=self.user, title="Old 1")
+        r2 = create_recipe(user=self.user, title="Old 2")
+        lunch = Tag.objects.create(user=self.user, name="Lunch")
+        r1.tags.add(lunch)
+        other = create_recipe(
+            user=create_user(email="other@example.com", password="test123"),
+        )
+        payload = [
+            {"id": r1.id, "title": "New 1", "tags": [{"name": "Dinner"}]},
+            {"id": r2.id, "time_minutes": 99},
+            {"id": other.id, "title": "Hijacked"},
+            {"id": r2.id, "title": "Twice"},
+        ]
+
+        res = self.client.patch(BULK_UPDATE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statuses = [result["status"] for result in res.data["results"]]
+        self.assertEqual(statuses, [200, 200, 404, 400])
+        self.assertEqual(res.data["results"][0]["data"]["title"], "New 1")
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(r1.title, "New 1")
+        self.assertEqual(
+            list(r1.tags.values_list("name", flat=True)), ["Dinner"],
+        )
+        self.assertEqual(r2.title, "Old 2")
+        self.assertEqual(r2.time_minutes, 99)
+        self.assertNotEqual(other.title, "Hijacked")
+
+    def test_bulk_update_invalid_id(self):
+        """Test items with a non integer id are rejected one by one"""
+        recipe = create_recipe(user=self.user, title="Old")
+        payload = [
+            {"id": [recipe.id], "title": "List"},
+            {"id": {}, "title": "Dict"},
+            {"id": True, "title": "Bool"},
+            {"id": recipe.id, "title": "New"},
+        ]
+
+        res = self.client.patch(BULK_UPDATE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statuses = [result["status"] for result in res.data["results"]]
+        self.assertEqual(statuses, [400, 400, 400, 200])
+        self.assertIn("id", res.data["results"][0]["errors"])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, "New")
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting a batch of recipes only removes the user's own"""
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        other = create_recipe(
+            user=create_user(email="other@example.com", password="test123"),
+        )
+        payload = {"ids": [r1.id, other.id, r2.id]}
+
+        res = self.client.post(BULK_DELETE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statuses = [result["status"] for result in res.data["results"]]
+        self.assertEqual(statuses, [204, 404, 204])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def test_bulk_delete_invalid_ids(self):
+        """Test non integer ids are a validation error keyed by position"""
+        recipe = create_recipe(user=self.user)
+        payload = {"ids": ["abc", recipe.id]}
+
+        res = self.client.post(BULK_DELETE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("0", res.json()["ids"])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_delete_query_budget(self):
+        """Test a bulk delete runs the same queries for any batch size"""
+        recipes = self._create_recipes_with_relations(20)
+        payload = {"ids": [recipe.id for recipe in recipes]}
+
+        res = self.assertMaxQueries(
+            7, self.client.post, BULK_DELETE_URL, payload, format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        self.assertFalse(Recipe.ingredients.through.objects.exists())
+
+    def _create_recipes_with_relations(self, count):
+        """Create recipes each linked to a couple of tags and ingredients"""
+        tags = [
+            Tag.objects.get_or_create(user=self.user, name=f"Tag {i}")[0]
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.get_or_create(
+                user=self.user,
+                name=f"Ingredient {i}",
+            )[0]
+            for i in range(3)
+        ]
+        recipes = []
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f"Recipe {i}")
+            recipe.tags.add(*tags[:2])
+            recipe.ingredients.add(*ingredients[1:])
+            recipes.append(recipe)
+        return recipes
+
+    def test_list_recipes_query_budget(self):
+        """Test listing recipes runs a constant number of queries"""
+        self._create_recipes_with_relations(2)
+        self.assertMaxQueries(4, self.client.get, RECIPE_URL)
+
+        self._create_recipes_with_relations(20)
+        res = self.assertMaxQueries(4, self.client.get, RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 22)
+        self.assertEqual(len(res.data["results"][0]["tags"]), 2)
+        self.assertEqual(len(res.data["results"][0]["ingredients"]), 2)
+
+    def test_get_recipe_detail_query_budget(self):
+        """Test retrieving a recipe prefetches its tags and ingredients"""
+        recipe = self._create_recipes_with_relations(1)[0]
+
+        res = self.assertMaxQueries(4, self.client.get, detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+    def test_list_rows_match_serializer(self):
+        """Test the values based list renders exactly like the serializer"""
+        recipes = self._create_recipes_with_relations(3)
+        recipes[0].link = "https://example.com/recipe.pdf"
+        recipes[0].save()
+        recipes[1].tags.clear()
+        tag = Tag.objects.create(user=self.user, name='Quote " tag')
+        recipes[2].tags.add(tag)
+        # Links are listed in id order, like the list rows
+        expected = RecipeSerializer(
+            Recipe.objects.filter(user=self.user).order_by("-id")
+            .prefetch_related(
+                Prefetch("tags", queryset=Tag.objects.order_by("id")),
+                Prefetch(
+                    "ingredients",
+                    queryset=Ingredient.objects.order_by("id"),
+                ),
+            ),
+            many=True,
+        ).data
+
+        res = self.assertMaxQueries(3, self.client.get, RECIPE_URL)
+
+        self.assertEqual(
+            res.content,
+            JSONRenderer().render({
+                "next": None,
+                "previous": None,
+                "results": expected,
+            }),
+        )
+
+    def test_list_rows_search_paginated(self):
+        """Test the values based list pages through search results"""
+        for i in range(3):
+            create_recipe(user=self.user, title=f"Soup {i}")
+
+        first = self.client.get(RECIPE_URL, {"search": "soup", "page_size": 2})
+        second = self.client.get(first.data["next"])
+
+        titles = [r["title"] for r in first.data["results"]]
+        titles += [r["title"] for r in second.data["results"]]
+        self.assertEqual(sorted(titles), ["Soup 0", "Soup 1", "Soup 2"])
+
+    def test_list_sparse_fields(self):
+        """Test ?fields= limits the output and the columns selected"""
+        recipe = self._create_recipes_with_relations(1)[0]
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {"fields": "id,title"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"],
+            [{"id": recipe.id, "title": recipe.title}],
+        )
+        sql = "\n".join(query["sql"] for query in ctx.captured_queries)
+        self.assertNotIn('"core_recipe"."price"', sql)
+        self.assertNotIn('"core_tag"', sql)
+        self.assertNotIn('"core_ingredient"', sql)
+
+    def test_list_unexpanded_relations_as_ids(self):
+        """Test relations not listed in ?expand= are returned as ids"""
+        recipe = self._create_recipes_with_relations(1)[0]
+        tag_ids = sorted(tag.id for tag in recipe.tags.all())
+        ingredient = recipe.ingredients.order_by("name").first()
+
+        res = self.client.get(RECIPE_URL, {"expand": "ingredients"})
+
+        result = res.data["results"][0]
+        self.assertEqual(sorted(result["tags"]), tag_ids)
+        self.assertIn(
+            {"id": ingredient.id, "name": ingredient.name},
+            result["ingredients"],
+        )
+        self.assertIn("price", result)
+
+    def test_detail_sparse_fields(self):
+        """Test ?fields= and ?expand= apply to recipe details"""
+        recipe = self._create_recipes_with_relations(1)[0]
+
+        res = self.client.get(
+            detail_url(recipe.id),
+            {"fields": "id,description,tags", "expand": "tags"},
+        )
+
+        self.assertEqual(set(res.data), {"id", "description", "tags"})
+        self.assertEqual(len(res.data["tags"]), 2)
+        self.assertIn("name", res.data["tags"][0])
+
+    def test_sparse_unknown_field_error(self):
+        """Test unknown fields or relations return a 400"""
+        res = self.client.get(RECIPE_URL, {"fields": "id,secret"})
+        expand = self.client.get(RECIPE_URL, {"expand": "user"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", res.data)
+        self.assertEqual(expand.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class ImageUploadTests(TestCase):
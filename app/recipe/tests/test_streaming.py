@@ -0,0 +1,121 @@
+"""
+Tests for streamed list responses
+"""
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe.serializers import (
+    RecipeSerializer,
+    TagSerializer,
+)
+from recipe.views import (
+    RecipeViewSet,
+    TagViewSet,
+)
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+@patch.object(RecipeViewSet, "stream_chunk_size", 2)
+@patch.object(TagViewSet, "stream_chunk_size", 2)
+class StreamingListTests(TestCase):
+    """Test ?stream= writes the whole list in chunks"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "user@example.com",
+            "testpass123",
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name="Vegan")
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f"Recipe {i}",
+                time_minutes=i,
+                price=Decimal("1.50"),
+            )
+            if i % 2:
+                recipe.tags.add(self.tag)
+
+    def _content(self, res):
+        """Return the joined body of a streamed response"""
+        self.assertTrue(res.streaming)
+        return b"".join(res.streaming_content)
+
+    def test_stream_recipes_json(self):
+        """Test streaming recipes as one JSON array of every recipe"""
+        expected = RecipeSerializer(
+            Recipe.objects.order_by("-id"),
+            many=True,
+        ).data
+
+        res = self.client.get(RECIPE_URL, {"stream": "json", "page_size": 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(json.loads(self._content(res)), expected)
+
+    def test_stream_recipes_ndjson(self):
+        """Test streaming recipes as one JSON document per line"""
+        res = self.client.get(RECIPE_URL, {
+            "stream": "ndjson",
+            "tags": self.tag.id,
+        })
+
+        lines = self._content(res).decode().splitlines()
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            [json.loads(line)["title"] for line in lines],
+            ["Recipe 3", "Recipe 1"],
+        )
+
+    def test_stream_recipes_sparse(self):
+        """Test sparse fieldsets apply to streamed recipes"""
+        res = self.client.get(RECIPE_URL, {
+            "stream": "json",
+            "fields": "title,tags",
+        })
+
+        data = json.loads(self._content(res))
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[1], {"title": "Recipe 3", "tags": [self.tag.id]})
+
+    def test_stream_tags(self):
+        """Test streaming tags"""
+        Tag.objects.create(user=self.user, name="Dessert")
+        expected = TagSerializer(
+            Tag.objects.order_by("-name"),
+            many=True,
+        ).data
+
+        res = self.client.get(TAGS_URL, {"stream": "json"})
+
+        self.assertEqual(json.loads(self._content(res)), expected)
+
+    def test_stream_empty(self):
+        """Test an empty streamed list is an empty JSON array"""
+        Recipe.objects.all().delete()
+
+        res = self.client.get(RECIPE_URL, {"stream": "json"})
+
+        self.assertEqual(self._content(res), b"[]")
+
+    def test_stream_invalid_format(self):
+        """Test an unknown stream format returns a 400"""
+        res = self.client.get(RECIPE_URL, {"stream": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -19,6 +19,7 @@ from core.models import (
 )
 
 TAGS_URL = reverse("recipe:tag-list")
+AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
 
 
 def detail_url(tag_id):
@@ -58,7 +59,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that only users can view their own tags"""
@@ -68,10 +69,10 @@ class PrivateTagsApiTests(TestCase):
         # Test that we cannot see this tag because it's not ours!
         tag = Tag.objects.create(user=self.user, name='Sweet')
         res = self.client.get(TAGS_URL)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data[0]["name"], tag.name)
-        self.assertEqual(res.data[0]["id"], tag.id)
+        self.assertEqual(res.data["results"][0]["name"], tag.name)
+        self.assertEqual(res.data["results"][0]["id"], tag.id)
 
     def test_update_tags(self):
         """Test updating of tags"""
@@ -85,6 +86,16 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload["name"])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming a tag to an existing name returns an error"""
+        Tag.objects.create(user=self.user, name="Lunch")
+        tag = Tag.objects.create(user=self.user, name="Dinner")
+        res = self.client.patch(detail_url(tag.id), {"name": "Lunch"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Dinner")
+
     def test_delete_tags(self):
         """Test deleting a single tag"""
         tag = Tag.objects.create(user=self.user, name="Breakfast")
@@ -109,8 +120,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only':1})
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_filtered_tags_unique(self):
         """Filtering tags by assigned returns unique items only."""
@@ -131,4 +142,31 @@ class PrivateTagsApiTests(TestCase):
         recipe1.tags.add(tag)
         recipe2.tags.add(tag)
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_tags_paginated(self):
+        """Test tags are returned in cursor pages ordered by name"""
+        for name in ["Dinner", "Breakfast", "Vegan", "Lunch", "Brunch"]:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [t["name"] for t in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            names += [t["name"] for t in res.data["results"]]
+        self.assertEqual(
+            names,
+            ["Vegan", "Lunch", "Dinner", "Brunch", "Breakfast"],
+        )
+
+    def test_autocomplete_tags(self):
+        """Test autocomplete suggests the user's matching tags"""
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        Tag.objects.create(user=self.user, name="Dinner")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "brea"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [TagSerializer(tag).data])
@@ -1,22 +1,42 @@
 """
 Views for recipe APIs
 """
+import re
 
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connection, transaction
+from django.db.models import (
+    BooleanField,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Prefetch,
+    Q,
+)
+from django.db.models.functions import Cast
 from rest_framework import (
     viewsets,
     mixins,
     status,
 )
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from core.authentication import CachedTokenAuthentication
 from core.models import (
     Recipe,
     Tag,
     Ingredient,
 )
+from core.storage import release
+from core.utils import chunked
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
@@ -24,6 +44,52 @@ from drf_spectacular.utils import (
     OpenApiParameter,
 )
 from recipe import serializers
+from recipe.cache import (
+    CachedListMixin,
+    bump_list_version,
+)
+from recipe.conditional import (
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+)
+from recipe.images import variant_names
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+from recipe.rows import (
+    RecipeRowsListMixin,
+    recipe_rows,
+    represent_rows,
+)
+from recipe.streaming import (
+    STREAM_PARAMETER,
+    StreamingListMixin,
+)
+
+# Upper bound for the number of autocomplete suggestions
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Recipe relations that can be nested with ?expand=
+RECIPE_RELATIONS = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+}
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='A comma separated list of fields to return.',
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description='A comma separated list of relations (tags, '
+                    'ingredients) to nest. When fields or expand is '
+                    'given, other relations are returned as id lists.',
+    ),
+]
 
 #Extend the default schema of drf_spectacular
 @extend_schema_view(
@@ -38,26 +104,86 @@ from recipe import serializers
                 'ingredients',
                 OpenApiTypes.STR,
                 description='A comma separated list of ingredient names.',
-            )
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full text search over title and description, '
+                            'results are ordered by relevance.',
+            ),
+            *SPARSE_PARAMETERS,
+            STREAM_PARAMETER,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=SPARSE_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+        StreamingListMixin,
+        CachedListMixin,
+        ConditionalListMixin,
+        ConditionalRetrieveMixin,
+        RecipeRowsListMixin,
+        viewsets.ModelViewSet):
     """Manage recipes in the database."""
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
 
     def _params_to_ints(self, qs):
         """Convert string IDs to integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _sparse_params(self):
+        """Return the requested (fields, expand), None when not given"""
+        if self.action not in ('list', 'retrieve'):
+            return None, None
+        allowed = {
+            'fields': set(self.get_serializer_class().Meta.fields),
+            'expand': set(RECIPE_RELATIONS),
+        }
+        parsed = []
+        for param, names in allowed.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                parsed.append(None)
+                continue
+            requested = [name.strip() for name in value.split(',')]
+            requested = [name for name in requested if name]
+            unknown = sorted(set(requested) - names)
+            if unknown:
+                raise ValidationError(
+                    {param: [f"Unknown field: {name}" for name in unknown]}
+                )
+            parsed.append(requested)
+        return tuple(parsed)
+
+    def _relation_prefetches(self, fields, expand):
+        """Prefetch only requested relations, ids only unless expanded"""
+        sparse = fields is not None or expand is not None
+        lookups = []
+        for name, model in RECIPE_RELATIONS.items():
+            if fields is not None and name not in fields:
+                continue
+            # Ordered by id like the rows of the list fast path
+            related = model.objects.order_by('id')
+            if sparse and name not in (expand or []):
+                related = related.only('id')
+            lookups.append(Prefetch(name, queryset=related))
+        return lookups
+
     def get_queryset(self):
         """Retrieve the authenticated user's recipes"""
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
+        search = self.request.query_params.get('search')
+        fields, expand = self._sparse_params()
+        queryset = self.queryset.defer('search_vector')
+        if fields is not None:
+            columns = [name for name in fields if name not in RECIPE_RELATIONS]
+            # id keys the pages and updated_at feeds the ETag
+            queryset = queryset.only('id', 'updated_at', *columns)
         # Filter by tag name
         if tags:
             tag_ids = self._params_to_ints(tags)
@@ -66,15 +192,58 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        # Joins can repeat rows, only pay for DISTINCT when filtering
+        if tags or ingredients:
+            queryset = queryset.distinct()
+        ordering = ('-id',)
+        # Full text search, ranked by relevance
+        if search:
+            query = SearchQuery(
+                search,
+                search_type='websearch',
+                config='english',
+            )
+            # A fixed precision rank keeps cursor positions exact
+            queryset = queryset.filter(search_vector=query).annotate(
+                search_rank=Cast(
+                    SearchRank(F('search_vector'), query),
+                    DecimalField(max_digits=12, decimal_places=8),
+                )
+            )
+            ordering = ('-search_rank', '-id')
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+        return queryset.filter(
+            user=self.request.user
+        ).order_by(*ordering).prefetch_related(
+            *self._relation_prefetches(fields, expand)
+        )
+
+    def get_stream_chunks(self, queryset):
+        """Stream default recipe lists from plain rows"""
+        if self._sparse_params() != (None, None):
+            yield from super().get_stream_chunks(queryset)
+            return
+        rows = recipe_rows(queryset).iterator(
+            chunk_size=self.stream_chunk_size,
+        )
+        for chunk in chunked(rows, self.stream_chunk_size):
+            yield represent_rows(chunk)
+
+    def get_serializer(self, *args, **kwargs):
+        """Pass sparse fieldset options to recipe serializers"""
+        fields, expand = self._sparse_params()
+        if fields is not None or expand is not None:
+            kwargs.update(fields=fields, expand=expand)
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         """Return the serializer class for request"""
-        if self.action == 'list':
+        if self.action in ('list', 'bulk_create', 'bulk_update'):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk_delete':
+            return serializers.RecipeBulkDeleteSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
@@ -91,6 +260,152 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _get_batch(self, data):
+        """Validate that a bulk request body is a list of items"""
+        if not isinstance(data, list):
+            raise ValidationError("Expected a list of items.")
+        if len(data) > serializers.BULK_MAX_ITEMS:
+            raise ValidationError(
+                "Ensure this list has no more than "
+                f"{serializers.BULK_MAX_ITEMS} items."
+            )
+        return data
+
+    def _serialize_recipes(self, recipes):
+        """Serialize saved recipes by id with their links prefetched"""
+        queryset = Recipe.objects.filter(
+            id__in=[recipe.id for recipe in recipes]
+        ).prefetch_related('tags', 'ingredients')
+        serializer = self.get_serializer(queryset, many=True)
+        return {item['id']: item for item in serializer.data}
+
+    @extend_schema(request=serializers.RecipeSerializer(many=True))
+    @action(methods=["POST"], detail=False, url_path='bulk-create')
+    def bulk_create(self, request):
+        """Create a batch of recipes in one transaction"""
+        checked = [
+            self.get_serializer(data=item)
+            for item in self._get_batch(request.data)
+        ]
+        valid = [serializer for serializer in checked if serializer.is_valid()]
+        created = self.get_serializer(many=True).create([
+            {**serializer.validated_data, 'user': request.user}
+            for serializer in valid
+        ])
+        # Bulk inserts skip model signals, invalidate cached lists here
+        bump_list_version(request.user.id)
+        data = self._serialize_recipes(created)
+        created = iter(created)
+        results = []
+        for serializer in checked:
+            if serializer.errors:
+                results.append({
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors,
+                })
+            else:
+                results.append({
+                    'status': status.HTTP_201_CREATED,
+                    'data': data[next(created).id],
+                })
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @extend_schema(request=serializers.RecipeSerializer(many=True))
+    @action(methods=["PATCH"], detail=False, url_path='bulk-update')
+    def bulk_update(self, request):
+        """Partially update a batch of recipes, each item carries its id"""
+        items = self._get_batch(request.data)
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        recipes = self.get_queryset().in_bulk(
+            [i for i in ids if isinstance(i, int)]
+        )
+        results = []
+        valid = []
+        seen = set()
+        for item in items:
+            recipe_id = item.get('id') if isinstance(item, dict) else None
+            if not isinstance(recipe_id, int) or isinstance(recipe_id, bool):
+                results.append({
+                    'id': recipe_id,
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': {'id': ['A valid integer is required.']},
+                })
+                continue
+            if recipe_id in seen:
+                results.append({
+                    'id': recipe_id,
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': {'id': ['Duplicate id in batch.']},
+                })
+                continue
+            if recipe_id not in recipes:
+                results.append({
+                    'id': recipe_id,
+                    'status': status.HTTP_404_NOT_FOUND,
+                })
+                continue
+            seen.add(recipe_id)
+            serializer = self.get_serializer(
+                recipes[recipe_id], data=item, partial=True,
+            )
+            if serializer.is_valid():
+                valid.append(serializer)
+                results.append({'id': recipe_id, 'status': status.HTTP_200_OK})
+            else:
+                results.append({
+                    'id': recipe_id,
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors,
+                })
+        updated = self.get_serializer(many=True).update(
+            [serializer.instance for serializer in valid],
+            [serializer.validated_data for serializer in valid],
+        )
+        bump_list_version(request.user.id)
+        data = self._serialize_recipes(updated)
+        for result in results:
+            if result['status'] == status.HTTP_200_OK:
+                result['data'] = data[result['id']]
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @action(methods=["POST"], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """Delete a batch of recipes by id in one transaction"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        with transaction.atomic():
+            rows = Recipe.objects.select_for_update().filter(
+                user=request.user,
+                id__in=ids,
+            ).values_list('id', 'image', 'image_variants')
+            owned = {recipe_id for recipe_id, _, _ in rows}
+            images = [
+                name
+                for _, image, variants in rows
+                for name in (image, *variant_names(variants))
+            ]
+            # Set based, a queryset delete() sends signals row by row, so
+            # the images and cached lists are handled once for the batch
+            for through in (Recipe.tags.through, Recipe.ingredients.through):
+                through.objects.filter(recipe_id__in=owned).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Recipe._meta.db_table} WHERE id = ANY(%s)",
+                    [list(owned)],
+                )
+            release(images)
+            bump_list_version(request.user.id)
+        results = [
+            {
+                'id': recipe_id,
+                'status': status.HTTP_204_NO_CONTENT
+                if recipe_id in owned else status.HTTP_404_NOT_FOUND,
+            }
+            for recipe_id in ids
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
 #Extend the default schema of drf_spectacular
 @extend_schema_view(
     list=extend_schema(
@@ -100,18 +415,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT,
                 enum=[0,1],
                 description="A comma-separated list of tags.",
-                )
+                ),
+            STREAM_PARAMETER,
         ]
-    )
+    ),
+    autocomplete=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                OpenApiTypes.STR,
+                description="Name prefix or misspelt name to complete.",
+            ),
+            OpenApiParameter(
+                "limit",
+                OpenApiTypes.INT,
+                description="Maximum number of suggestions (default 10).",
+            ),
+        ]
+    ),
 )
 class BaseRecipeAttrViewSet(
-    mixins.DestroyModelMixin,
-    mixins.UpdateModelMixin,
-    mixins.ListModelMixin,
-    viewsets.GenericViewSet):
+        StreamingListMixin,
+        CachedListMixin,
+        ConditionalListMixin,
+        mixins.DestroyModelMixin,
+        mixins.UpdateModelMixin,
+        mixins.ListModelMixin,
+        viewsets.GenericViewSet):
     """Base Viewset for managing a model with attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         """Filter querysets by authenicated user"""
@@ -120,9 +454,37 @@ class BaseRecipeAttrViewSet(
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe__isnull=False).distinct()
+
+        return queryset.filter(user=self.request.user).order_by("-name")
 
-        return queryset.filter(user=self.request.user).order_by("-name").distinct()
+    @action(methods=["GET"], detail=False)
+    def autocomplete(self, request):
+        """Suggest names by prefix or trigram similarity, most used first"""
+        term = request.query_params.get("q", "").strip()
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            raise ValidationError({"limit": ["A valid integer is required."]})
+        limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+        if not term:
+            return Response([])
+        # istartswith compiles to UPPER(name) LIKE, which no index serves.
+        # An anchored ~* regex and %> both use the (user, name
+        # gin_trgm_ops) index
+        is_prefix = Q(name__iregex=f"^{re.escape(term)}")
+        queryset = self.queryset.filter(user=request.user).filter(
+            is_prefix | Q(name__trigram_word_similar=term)
+        ).annotate(
+            is_prefix=ExpressionWrapper(
+                is_prefix,
+                output_field=BooleanField(),
+            ),
+            similarity=TrigramWordSimilarity(term, "name"),
+            usage=Count("recipe"),
+        ).order_by("-is_prefix", "-similarity", "-usage", "name")[:limit]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -2,10 +2,12 @@
 Views for user API
 """
 
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer
@@ -24,9 +26,13 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated users profile"""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return authenticated user"""
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        # request.user may come from the token cache, an update saving that
+        # copy could undo a deactivation or password change
+        return get_user_model().objects.get(pk=self.request.user.pk)
@@ -2,6 +2,11 @@
 
 set -e
 
+# Shared by the uWSGI workers so /api/metrics/ adds up all of them
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/vol/metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"/*
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate